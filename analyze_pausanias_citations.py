@@ -7,11 +7,12 @@ Creates visualizations and statistical analysis of citation distribution.
 """
 import re
 import sqlite3
+from collections import Counter
 from pathlib import Path
-from collections import defaultdict
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs_version
 from plotly.subplots import make_subplots
 from scipy import stats
 
@@ -32,78 +33,86 @@ BOOK_NAMES = {
     10: "Phocis"
 }
 
+# Matches citations like (7,17,6), 9,25,6 or γ̄ (3,2,2) (with a Greek numeral
+# prefix). Used by Postgres regexp_match in get_stephanos_citations; citations
+# mentioning FGrHist are a different Pausanias and are skipped.
+_CITATION_RE = re.compile(r'\(?(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\)?')
+_FGRHIST = 'FGrHist'
 
-def parse_citation(citation_str):
-    """Parse a Pausanias citation string into (book, chapter, section).
 
-    Handles formats like:
-    - (7,17,6)
-    - 9,25,6
-    - γ̄ (3,2,2)  - with Greek numeral prefix
-    """
-    if not citation_str:
-        return None
-
-    # Skip FGrHist references (different Pausanias)
-    if 'FGrHist' in citation_str:
-        return None
-
-    # Extract numbers from parentheses or comma-separated
-    # Match patterns like (7,17,6) or 7,17,6
-    match = re.search(r'\(?(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\)?', citation_str)
-    if match:
-        book = int(match.group(1))
-        chapter = int(match.group(2))
-        section = int(match.group(3))
-        return (book, chapter, section)
+def get_stephanos_citations(conn):
+    """Get all Pausanias citations from Stephanos.
 
-    return None
-
-
-def get_stephanos_citations(cur):
-    """Get all Pausanias citations from Stephanos."""
+    Returns a DataFrame with columns raw, book, chapter, section, lemma and
+    lemma_id. Citations are parsed by Postgres with _CITATION_RE, so rows
+    arrive with integer book/chapter/section.
+    """
+    cur = conn.cursor()
     cur.execute("""
-        SELECT p.citation, a.lemma, a.id as lemma_id
-        FROM proper_nouns p
-        JOIN assembled_lemmas a ON p.lemma_id = a.id
-        WHERE p.lemma_form = 'Παυσανίας' AND p.role = 'source'
-        ORDER BY p.citation
-    """)
-
-    citations = []
-    for citation_str, lemma, lemma_id in cur.fetchall():
-        parsed = parse_citation(citation_str)
-        if parsed:
-            citations.append({
-                'raw': citation_str,
-                'book': parsed[0],
-                'chapter': parsed[1],
-                'section': parsed[2],
-                'lemma': lemma,
-                'lemma_id': lemma_id
-            })
-
-    return citations
-
-
-def get_pausanias_structure(pausanias_db_path):
-    """Get the full structure of Pausanias from the sqlite database."""
-    conn = sqlite3.connect(pausanias_db_path)
+        SELECT raw, m[1]::int AS book, m[2]::int AS chapter, m[3]::int AS section, lemma, lemma_id
+        FROM (
+            SELECT p.citation AS raw, a.lemma, a.id AS lemma_id,
+                   regexp_match(p.citation, %(pattern)s) AS m
+            FROM proper_nouns p
+            JOIN assembled_lemmas a ON p.lemma_id = a.id
+            WHERE p.lemma_form = 'Παυσανίας' AND p.role = 'source'
+              -- Skip FGrHist references (different Pausanias)
+              AND position(%(fgrhist)s IN p.citation) = 0
+        ) parsed
+        WHERE m IS NOT NULL
+        ORDER BY raw
+    """, {'pattern': _CITATION_RE.pattern, 'fgrhist': _FGRHIST})
+    rows = cur.fetchall()
+    cur.close()
+
+    # Explicit int dtypes keep an empty result usable by np.bincount
+    return pd.DataFrame(rows, columns=[
+        'raw', 'book', 'chapter', 'section', 'lemma', 'lemma_id'
+    ]).astype({'book': int, 'chapter': int, 'section': int})
+
+
+def open_pausanias_db(pausanias_db_path):
+    """Open the Pausanias sqlite database read-only, tuned for full scans."""
+    conn = sqlite3.connect(f"{Path(pausanias_db_path).resolve().as_uri()}?mode=ro", uri=True)
+    # Read through the OS page cache via mmap and allow a 64 MiB page cache
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA cache_size = -65536")
+    return conn
+
+
+def get_pausanias_structure(pausanias_db):
+    """Get the full structure of Pausanias from the sqlite database.
+
+    Accepts an open connection (see open_pausanias_db) or a database path.
+    Returns {book: {chapter: section_count}}. Passage ids have the form
+    book.chapter.section; they are split and counted inside SQLite.
+    """
+    owns_connection = not isinstance(pausanias_db, sqlite3.Connection)
+    conn = open_pausanias_db(pausanias_db) if owns_connection else pausanias_db
     cur = conn.cursor()
 
-    cur.execute("SELECT id FROM passages")
-
-    structure = defaultdict(lambda: defaultdict(list))
+    cur.execute("""
+        WITH split AS (
+            SELECT substr(id, 1, instr(id, '.') - 1) AS book,
+                   substr(id, instr(id, '.') + 1) AS rest
+            FROM passages
+            WHERE instr(id, '.') > 0
+        )
+        SELECT CAST(book AS INTEGER) AS book,
+               CAST(substr(rest, 1, instr(rest, '.') - 1) AS INTEGER) AS chapter,
+               COUNT(*) AS section_count
+        FROM split
+        WHERE instr(rest, '.') > 0
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """)
 
-    for (passage_id,) in cur.fetchall():
-        parts = passage_id.split('.')
-        if len(parts) >= 3:
-            book = int(parts[0])
-            chapter = int(parts[1])
-            section = int(parts[2])
-            structure[book][chapter].append(section)
+    structure = {}
+    for book, chapter, section_count in cur.fetchall():
+        structure.setdefault(book, {})[chapter] = section_count
 
-    conn.close()
+    if owns_connection:
+        conn.close()
     return structure
 
 
@@ -111,12 +120,10 @@ def analyze_distribution(citations, structure):
     """Analyze the distribution of citations across Pausanias."""
 
     # Count citations per book
-    book_counts = defaultdict(int)
-    chapter_citations = []  # (book, chapter) tuples
-
-    for c in citations:
-        book_counts[c['book']] += 1
-        chapter_citations.append((c['book'], c['chapter']))
+    book_totals = np.bincount(citations['book'].to_numpy(), minlength=11)
+    book_counts = {book: int(count) for book, count in enumerate(book_totals) if count}
+    chapter_citations = list(zip(citations['book'].tolist(), citations['chapter'].tolist()))
+    chapter_citation_counts = Counter(chapter_citations)
 
     # Count total sections per book
     book_sections = {}
@@ -125,16 +132,17 @@ def analyze_distribution(citations, structure):
     total_chapters = 0
 
     for book, chapters in structure.items():
-        book_sections[book] = sum(len(secs) for secs in chapters.values())
+        book_sections[book] = sum(chapters.values())
         total_sections += book_sections[book]
         total_chapters += len(chapters)
-        for chapter, sections in chapters.items():
-            chapter_sections[(book, chapter)] = len(sections)
+        for chapter, section_count in chapters.items():
+            chapter_sections[(book, chapter)] = section_count
 
     return {
-        'book_counts': dict(book_counts),
+        'book_counts': book_counts,
         'book_sections': book_sections,
         'chapter_citations': chapter_citations,
+        'chapter_citation_counts': chapter_citation_counts,
         'chapter_sections': chapter_sections,
         'total_sections': total_sections,
         'total_chapters': total_chapters,
@@ -143,25 +151,33 @@ def analyze_distribution(citations, structure):
 
 
 def chi_square_test(observed_counts, expected_proportions, total_observed):
-    """Perform chi-square test for distribution uniformity."""
+    """Perform chi-square test for distribution uniformity.
+
+    The statistic is computed directly with NumPy; SciPy is only used for
+    the p-value of the chi-square distribution.
+    """
     books = sorted(expected_proportions.keys())
-    observed = [observed_counts.get(b, 0) for b in books]
-    expected = [expected_proportions[b] * total_observed for b in books]
+    observed = np.array([observed_counts.get(b, 0) for b in books], dtype=float)
+    expected = np.array([expected_proportions[b] for b in books], dtype=float) * total_observed
 
     # Filter out books with 0 expected (shouldn't happen but just in case)
-    valid = [(o, e) for o, e in zip(observed, expected) if e > 0]
-    if len(valid) < 2:
+    valid = expected > 0
+    if np.count_nonzero(valid) < 2:
         return None, None
 
-    observed_valid = [v[0] for v in valid]
-    expected_valid = [v[1] for v in valid]
+    observed = observed[valid]
+    expected = expected[valid]
 
-    chi2, p_value = stats.chisquare(observed_valid, expected_valid)
+    chi2 = float(np.sum((observed - expected) ** 2 / expected))
+    p_value = float(stats.chi2.sf(chi2, len(observed) - 1))
     return chi2, p_value
 
 
-def create_visualization(citations, analysis, output_dir):
-    """Create interactive Plotly visualization of citation distribution."""
+def create_visualization(citations, analysis):
+    """Create interactive Plotly visualization of citation distribution.
+
+    Returns the figure; generate_report embeds it directly in the report page.
+    """
 
     # Create figure with subplots
     fig = make_subplots(
@@ -213,19 +229,18 @@ def create_visualization(citations, analysis, output_dir):
     )
 
     # 2. Scatter plot: citations by chapter
-    scatter_x = []
-    scatter_y = []
-    scatter_text = []
-
-    for c in citations:
-        # Calculate x position as book + chapter fraction
-        x = c['book'] + (c['chapter'] / 50)  # Spread chapters within each book
-        scatter_x.append(x)
-        scatter_y.append(c['section'])
-        scatter_text.append(f"{c['book']}.{c['chapter']}.{c['section']}: {c['lemma']}")
+    # x position is book + chapter fraction, spreading chapters within each book
+    scatter_x = (citations['book'] + citations['chapter'] / 50).to_numpy()
+    scatter_y = citations['section'].to_numpy()
+    scatter_text = (
+        citations['book'].astype(str) + '.'
+        + citations['chapter'].astype(str) + '.'
+        + citations['section'].astype(str) + ': '
+        + citations['lemma'].astype(str)
+    ).tolist()
 
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=scatter_x,
             y=scatter_y,
             mode='markers',
@@ -244,16 +259,25 @@ def create_visualization(citations, analysis, output_dir):
     # 3. Coverage heatmap: which chapters are cited
     # Create a matrix: rows = books, cols = chapters (up to max chapter per book)
     max_chapters = max(max(structure[b].keys()) for b in structure)
-    coverage_matrix = np.zeros((10, max_chapters))
 
-    cited_chapters = set((c['book'], c['chapter']) for c in citations)
+    # Citation count per (book, chapter), accumulated in one NumPy pass
+    books_arr = citations['book'].to_numpy() - 1
+    chapters_arr = citations['chapter'].to_numpy() - 1
+    in_range = (books_arr >= 0) & (books_arr < 10) & (chapters_arr >= 0) & (chapters_arr < max_chapters)
+    density_matrix = np.zeros((10, max_chapters))
+    np.add.at(density_matrix, (books_arr[in_range], chapters_arr[in_range]), 1)
 
+    exists = np.zeros((10, max_chapters), dtype=bool)
     for book in range(1, 11):
-        for chapter in structure[book].keys():
-            if (book, chapter) in cited_chapters:
-                coverage_matrix[book-1, chapter-1] = 2  # Cited
-            else:
-                coverage_matrix[book-1, chapter-1] = 1  # Exists, not cited
+        chapter_idx = np.fromiter(structure.get(book, {}).keys(), dtype=np.intp) - 1
+        exists[book-1, chapter_idx] = True
+
+    # Chapters past the end of a book are NaN so Plotly leaves them as gaps
+    # (serialized as null) instead of drawing a cell for them.
+    coverage_matrix = np.full((10, max_chapters), np.nan)
+    coverage_matrix[exists] = 1  # Exists, not cited
+    coverage_matrix[exists & (density_matrix > 0)] = 2  # Cited
+    density_matrix[~(exists | (density_matrix > 0))] = np.nan
 
     fig.add_trace(
         go.Heatmap(
@@ -261,6 +285,9 @@ def create_visualization(citations, analysis, output_dir):
             x=list(range(1, max_chapters + 1)),
             y=[BOOK_NAMES[b] for b in range(1, 11)],
             colorscale=[[0, 'white'], [0.5, '#ecf0f1'], [1, '#3498db']],
+            zmin=0,
+            zmax=2,
+            zsmooth=False,
             showscale=False,
             hovertemplate='Book %{y}<br>Chapter %{x}<br>%{z}<extra></extra>'
         ),
@@ -268,20 +295,13 @@ def create_visualization(citations, analysis, output_dir):
     )
 
     # 4. Density heatmap: citation count per chapter
-    density_matrix = np.zeros((10, max_chapters))
-    chapter_citation_counts = defaultdict(int)
-    for c in citations:
-        chapter_citation_counts[(c['book'], c['chapter'])] += 1
-
-    for (book, chapter), count in chapter_citation_counts.items():
-        density_matrix[book-1, chapter-1] = count
-
     fig.add_trace(
         go.Heatmap(
             z=density_matrix,
             x=list(range(1, max_chapters + 1)),
             y=[BOOK_NAMES[b] for b in range(1, 11)],
             colorscale='Blues',
+            zsmooth=False,
             hovertemplate='Book %{y}<br>Chapter %{x}<br>Citations: %{z}<extra></extra>'
         ),
         row=2, col=2
@@ -304,28 +324,53 @@ def create_visualization(citations, analysis, output_dir):
     fig.update_xaxes(title_text="Chapter", row=2, col=1)
     fig.update_xaxes(title_text="Chapter", row=2, col=2)
 
-    # Save
-    output_path = output_dir / "pausanias_citations.html"
-    fig.write_html(str(output_path), include_plotlyjs='cdn')
+    return fig
 
-    return str(output_path)
 
+def generate_report(citations, analysis, chi2, p_value, structure, fig):
+    """Generate HTML report with analysis.
 
-def generate_report(citations, analysis, chi2, p_value, structure):
-    """Generate HTML report with analysis."""
+    The figure is inlined as JSON and drawn with Plotly.newPlot, using the
+    plotly.js bundle from the CDN, instead of loading a second page in an
+    iframe.
+    """
 
-    unique_chapters = len(set((c['book'], c['chapter']) for c in citations))
+    unique_chapters = len(analysis['chapter_citation_counts'])
     total_chapters = analysis['total_chapters']
     coverage_pct = unique_chapters / total_chapters * 100
-    books_with_citations = len(set(c['book'] for c in citations))
+    books_with_citations = citations['book'].nunique()
     sig_class = 'significant' if p_value and p_value < 0.05 else ''
     interpretation = get_interpretation(p_value, analysis)
+    plotly_js_url = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+    # Plotly picks orjson for serialization when it is installed
+    figure_json = fig.to_json().replace('</', '<\\/')
+
+    books = list(range(1, 11))
+    book_table = pd.DataFrame({
+        'Book': books,
+        'Name': [BOOK_NAMES[b] for b in books],
+        'Citations': [analysis['book_counts'].get(b, 0) for b in books],
+        'Sections in Pausanias': [analysis['book_sections'].get(b, 0) for b in books],
+    })
+    book_table['Expected Citations'] = (
+        book_table['Sections in Pausanias'] / analysis['total_sections'] * analysis['total_citations']
+    )
+    book_table['Difference'] = book_table['Citations'] - book_table['Expected Citations']
+    book_table_html = book_table.to_html(
+        index=False,
+        border=0,
+        formatters={
+            'Expected Citations': '{:.1f}'.format,
+            'Difference': lambda d: f"+{d:.1f}" if d > 0 else f"{d:.1f}",
+        },
+    )
 
-    html = f"""<!DOCTYPE html>
+    parts = [f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <title>Stephanos's Citations of Pausanias</title>
+    <script src="{plotly_js_url}"></script>
     <style>
         body {{ font-family: 'Segoe UI', sans-serif; max-width: 1400px; margin: 0 auto; padding: 20px; background: #f5f5f5; }}
         h1 {{ color: #2c3e50; border-bottom: 3px solid #3498db; padding-bottom: 10px; }}
@@ -338,7 +383,7 @@ def generate_report(citations, analysis, chi2, p_value, structure):
         .citation-link {{ color: #3498db; text-decoration: none; }}
         .citation-link:hover {{ text-decoration: underline; }}
         .significant {{ color: #e74c3c; font-weight: bold; }}
-        iframe {{ border: 1px solid #ddd; margin: 20px 0; }}
+        #pausanias-figure {{ border: 1px solid #ddd; margin: 20px 0; background: white; overflow-x: auto; }}
     </style>
 </head>
 <body>
@@ -361,41 +406,14 @@ def generate_report(citations, analysis, chi2, p_value, structure):
     </div>
 
     <h2>Interactive Visualization</h2>
-    <iframe src="pausanias_citations.html" width="100%" height="950"></iframe>
+    <div id="pausanias-figure"></div>
+    <script>
+        var pausaniasFigure = {figure_json};
+        Plotly.newPlot('pausanias-figure', pausaniasFigure.data, pausaniasFigure.layout);
+    </script>
 
     <h2>Citations by Book</h2>
-    <table>
-        <tr>
-            <th>Book</th>
-            <th>Name</th>
-            <th>Citations</th>
-            <th>Sections in Pausanias</th>
-            <th>Expected Citations</th>
-            <th>Difference</th>
-        </tr>
-"""
-
-    total_sections = analysis['total_sections']
-    total_citations = analysis['total_citations']
-
-    for book in range(1, 11):
-        observed = analysis['book_counts'].get(book, 0)
-        sections = analysis['book_sections'].get(book, 0)
-        expected = (sections / total_sections) * total_citations
-        diff = observed - expected
-        diff_str = f"+{diff:.1f}" if diff > 0 else f"{diff:.1f}"
-
-        html += f"""        <tr>
-            <td>{book}</td>
-            <td>{BOOK_NAMES[book]}</td>
-            <td>{observed}</td>
-            <td>{sections}</td>
-            <td>{expected:.1f}</td>
-            <td>{diff_str}</td>
-        </tr>
-"""
-
-    html += """    </table>
+{book_table_html}
 
     <h2>Individual Citations</h2>
     <table>
@@ -404,18 +422,18 @@ def generate_report(citations, analysis, chi2, p_value, structure):
             <th>Stephanos Entry</th>
             <th>Link to Pausanias</th>
         </tr>
-"""
-
-    for c in sorted(citations, key=lambda x: (x['book'], x['chapter'], x['section'])):
-        pausanias_link = f"https://pausanias.symmachus.org/sentences/{c['book']}_{c['chapter']}.html"
-        html += f"""        <tr>
-            <td>{c['book']}.{c['chapter']}.{c['section']}</td>
-            <td>{c['lemma']}</td>
-            <td><a href="{pausanias_link}" class="citation-link" target="_blank">{c['book']}.{c['chapter']}</a></td>
+"""]
+
+    for c in citations.sort_values(['book', 'chapter', 'section']).itertuples(index=False):
+        pausanias_link = f"https://pausanias.symmachus.org/sentences/{c.book}_{c.chapter}.html"
+        parts.append(f"""        <tr>
+            <td>{c.book}.{c.chapter}.{c.section}</td>
+            <td>{c.lemma}</td>
+            <td><a href="{pausanias_link}" class="citation-link" target="_blank">{c.book}.{c.chapter}</a></td>
         </tr>
-"""
+""")
 
-    html += f"""    </table>
+    parts.append(f"""    </table>
 
     <h2>Methodology Notes</h2>
     <div class="stats-box">
@@ -429,9 +447,9 @@ def generate_report(citations, analysis, chi2, p_value, structure):
     </div>
 </body>
 </html>
-"""
+""")
 
-    return html
+    return "".join(parts)
 
 
 def get_interpretation(p_value, analysis):
@@ -459,18 +477,17 @@ def main():
 
     # Connect to databases
     conn = get_connection()
-    cur = conn.cursor()
 
-    pausanias_db = Path("/home/stephanos/pausanias.sqlite")
+    pausanias_conn = open_pausanias_db(Path("/home/stephanos/pausanias.sqlite"))
 
     # Get citations and structure
     print("  Extracting citations from Stephanos...")
-    citations = get_stephanos_citations(cur)
+    citations = get_stephanos_citations(conn)
     print(f"    Found {len(citations)} citations")
 
     print("  Loading Pausanias structure...")
     global structure
-    structure = get_pausanias_structure(pausanias_db)
+    structure = get_pausanias_structure(pausanias_conn)
 
     print("  Analyzing distribution...")
     analysis = analyze_distribution(citations, structure)
@@ -494,17 +511,17 @@ def main():
 
     # Create visualization
     print("  Creating visualization...")
-    viz_path = create_visualization(citations, analysis, output_dir)
-    print(f"    Saved to {viz_path}")
+    fig = create_visualization(citations, analysis)
 
     # Generate report
     print("  Generating report...")
-    report_html = generate_report(citations, analysis, chi2, p_value, structure)
+    report_html = generate_report(citations, analysis, chi2, p_value, structure, fig)
     report_path = output_dir / "pausanias_analysis.html"
     report_path.write_text(report_html, encoding='utf-8')
     print(f"    Saved to {report_path}")
 
     conn.close()
+    pausanias_conn.close()
 
     print("\nDone!")
     print(f"  View the analysis at: {report_path.absolute()}")
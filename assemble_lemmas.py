@@ -6,13 +6,39 @@ Pulls processed images, stitches continuation-only pages onto the previous lemma
 and records per-lemma rows in assembled_lemmas. Can optionally rebuild the table.
 """
 import argparse
+import csv
+import io
 import json
-from datetime import datetime
+import sys
 from pathlib import Path
 
+from psycopg2.extras import execute_values
+
 from db import get_connection
 from volume_metadata import ensure_volume_columns
-from volume_metadata import ensure_volume_columns
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+# keep catching the stdlib exception.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+# Columns added after assembled_lemmas was first created
+BACKFILL_COLUMNS = (
+    ("volume_number", "INTEGER"),
+    ("volume_label", "TEXT"),
+    ("letter_range", "TEXT"),
+    ("ocr_generation_id", "INTEGER"),
+    ("ocr_processed_at", "TIMESTAMPTZ"),
+    ("nodegoat_id", "TEXT"),
+    ("meineke_id", "TEXT"),
+    ("billerbeck_id", "TEXT"),
+    ("version", "TEXT"),
+)
 
 
 def ensure_table(cur):
@@ -47,63 +73,90 @@ def ensure_table(cur):
         )
         """
     )
-    # Backfill columns if table already existed
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS volume_number INTEGER")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS volume_label TEXT")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS letter_range TEXT")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS ocr_generation_id INTEGER")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS ocr_processed_at TIMESTAMPTZ")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS nodegoat_id TEXT")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS meineke_id TEXT")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS billerbeck_id TEXT")
-    cur.execute("ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS version TEXT")
-    # Ensure version column has default and NOT NULL constraint
-    cur.execute("ALTER TABLE assembled_lemmas ALTER COLUMN version SET DEFAULT 'epitome'")
-    try:
-        cur.execute("ALTER TABLE assembled_lemmas ALTER COLUMN version SET NOT NULL")
-    except Exception:
-        # If there are NULL values, this will fail - that's expected during migration
-        pass
-    # Drop old unique index if it exists
-    cur.execute("DROP INDEX IF EXISTS assembled_lemmas_source_image_ids_idx")
-    cur.execute("DROP INDEX IF EXISTS assembled_lemmas_composite_idx")
-    # Create composite unique index on (source_image_ids, entry_number, version)
+    # Look up existing columns and indexes once so the DDL below (each
+    # statement takes an ACCESS EXCLUSIVE lock) only runs when needed
     cur.execute(
         """
-        CREATE UNIQUE INDEX IF NOT EXISTS assembled_lemmas_composite_version_idx
-        ON assembled_lemmas (source_image_ids, entry_number, version)
+        SELECT column_name, is_nullable, column_default
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'assembled_lemmas'
         """
     )
-    # Create unique index on (billerbeck_id, version) to prevent duplicate Billerbeck IDs
+    columns = {name: (is_nullable, default) for name, is_nullable, default in cur.fetchall()}
     cur.execute(
         """
-        CREATE UNIQUE INDEX IF NOT EXISTS assembled_lemmas_billerbeck_version_idx
-        ON assembled_lemmas (billerbeck_id, version)
-        WHERE billerbeck_id IS NOT NULL
+        SELECT indexname
+        FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = 'assembled_lemmas'
         """
     )
+    indexes = {name for (name,) in cur.fetchall()}
+
+    # Backfill columns if table already existed
+    for column, column_type in BACKFILL_COLUMNS:
+        if column not in columns:
+            cur.execute(f"ALTER TABLE assembled_lemmas ADD COLUMN IF NOT EXISTS {column} {column_type}")
+    # Ensure version column has default and NOT NULL constraint
+    version_nullable, version_default = columns.get("version", ("YES", None))
+    if version_default is None:
+        cur.execute("ALTER TABLE assembled_lemmas ALTER COLUMN version SET DEFAULT 'epitome'")
+    if version_nullable == "YES":
+        try:
+            cur.execute("ALTER TABLE assembled_lemmas ALTER COLUMN version SET NOT NULL")
+        except Exception:
+            # If there are NULL values, this will fail - that's expected during migration
+            pass
+    # Drop old unique indexes if they exist
+    for old_index in ("assembled_lemmas_source_image_ids_idx", "assembled_lemmas_composite_idx"):
+        if old_index in indexes:
+            cur.execute(f"DROP INDEX IF EXISTS {old_index}")
+    # Create composite unique index on (source_image_ids, entry_number, version)
+    if "assembled_lemmas_composite_version_idx" not in indexes:
+        cur.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS assembled_lemmas_composite_version_idx
+            ON assembled_lemmas (source_image_ids, entry_number, version)
+            """
+        )
+    # Create unique index on (billerbeck_id, version) to prevent duplicate Billerbeck IDs
+    if "assembled_lemmas_billerbeck_version_idx" not in indexes:
+        cur.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS assembled_lemmas_billerbeck_version_idx
+            ON assembled_lemmas (billerbeck_id, version)
+            WHERE billerbeck_id IS NOT NULL
+            """
+        )
 
 
 def load_headword_lookup(cur):
-    """Load mapping of greek_headword -> ids from meineke_headwords."""
+    """Load mapping of greek_headword -> (nodegoat_id, meineke_id, billerbeck_id)."""
     cur.execute(
         """
         SELECT greek_headword, nodegoat_id, meineke_id, billerbeck_id
         FROM meineke_headwords
         """
     )
-    lookup = {}
-    for greek_headword, nodegoat_id, meineke_id, billerbeck_id in cur.fetchall():
-        lookup[greek_headword.strip()] = {
-            "nodegoat_id": nodegoat_id,
-            "meineke_id": meineke_id,
-            "billerbeck_id": billerbeck_id,
-        }
-    return lookup
+    return {
+        sys.intern(greek_headword.strip()): (nodegoat_id, meineke_id, billerbeck_id)
+        for greek_headword, nodegoat_id, meineke_id, billerbeck_id in cur
+    }
+
+
+LOAD_ITERSIZE = 2000
 
 
 def load_processed_images(cur):
-    cur.execute(
+    """
+    Open a server-side cursor over processed images.
+
+    Rows (including the lemma_json blobs) are fetched LOAD_ITERSIZE at a time
+    while iterating, rather than materialized all at once. The caller closes
+    the returned cursor.
+    """
+    stream = cur.connection.cursor(name="assemble_processed_images")
+    stream.itersize = LOAD_ITERSIZE
+    stream.execute(
         """
         SELECT id, image_filename, lemma_json, volume_number, volume_label, letter_range,
                ocr_generation_id, processed_at
@@ -112,19 +165,33 @@ def load_processed_images(cur):
         ORDER BY id
         """
     )
-    return cur.fetchall()
+    return stream
+
+
+# Page statuses that are dropped and break any continuation chain -> log reason
+SKIP_STATUSES = {
+    "non_greek_error": "non-Greek page detected",
+    "apparatus_only": "apparatus only",
+}
 
 
 def build_assembled_entries(rows, headword_lookup):
+    """Assemble lemma entries across pages. Returns (entries, number of image rows read)."""
     entries = []
+    image_count = 0
     last_entry = None
+    # Bound methods hoisted out of the per-entry loop
+    append_entry = entries.append
+    lookup_headword = headword_lookup.get
+    intern = sys.intern
 
     for image_id, filename, lemma_json, volume_number, volume_label, letter_range, ocr_generation_id, processed_at in rows:
+        image_count += 1
         if not lemma_json:
             continue
 
         try:
-            data = json.loads(lemma_json)
+            data = _json_loads(lemma_json)
         except json.JSONDecodeError:
             print(f"Skipping {filename}: invalid JSON")
             continue
@@ -140,12 +207,9 @@ def build_assembled_entries(rows, headword_lookup):
         elif isinstance(data, list):
             page_entries = data
 
-        if status == "non_greek_error":
-            print(f"Skipping {filename}: non-Greek page detected")
-            last_entry = None
-            continue
-        if status == "apparatus_only":
-            print(f"Skipping {filename}: apparatus only")
+        skip_reason = SKIP_STATUSES.get(status)
+        if skip_reason:
+            print(f"Skipping {filename}: {skip_reason}")
             last_entry = None
             continue
         if status == "continuation_only":
@@ -169,13 +233,14 @@ def build_assembled_entries(rows, headword_lookup):
             continue
 
         for entry in page_entries:
+            get = entry.get
             assembled = {
-                "lemma": entry.get("lemma", "").strip(),
-                "entry_number": entry.get("entry_number"),
-                "type": entry.get("type", ""),
-                "greek_text": entry.get("greek_text", "").strip(),
-                "confidence": entry.get("confidence", "normal"),
-                "version": entry.get("version") or "epitome",  # default to epitome if not specified
+                "lemma": intern(get("lemma", "").strip()),
+                "entry_number": get("entry_number"),
+                "type": get("type", ""),
+                "greek_text": get("greek_text", "").strip(),
+                "confidence": get("confidence", "normal"),
+                "version": get("version") or "epitome",  # default to epitome if not specified
                 "source_image_ids": [image_id],
                 "volume_number": volume_number,
                 "volume_label": volume_label,
@@ -183,42 +248,87 @@ def build_assembled_entries(rows, headword_lookup):
                 "ocr_generation_id": ocr_generation_id,
                 "ocr_processed_at": processed_at,
             }
-            meta = headword_lookup.get(assembled["lemma"])
+            meta = lookup_headword(assembled["lemma"])
             if meta:
-                assembled["nodegoat_id"] = meta["nodegoat_id"]
-                assembled["meineke_id"] = meta["meineke_id"]
-                assembled["billerbeck_id"] = meta["billerbeck_id"]
-            entries.append(assembled)
+                (
+                    assembled["nodegoat_id"],
+                    assembled["meineke_id"],
+                    assembled["billerbeck_id"],
+                ) = meta
+            append_entry(assembled)
             last_entry = assembled
 
-    return entries
+    return entries, image_count
+
+
+UPSERT_PAGE_SIZE = 500
+
+COPY_COLUMNS = (
+    "lemma, entry_number, type, greek_text, confidence, version, source_image_ids, "
+    "volume_number, volume_label, letter_range, ocr_generation_id, ocr_processed_at, "
+    "nodegoat_id, meineke_id, billerbeck_id"
+)
+
+UPSERT_SQL = f"""
+    INSERT INTO assembled_lemmas ({COPY_COLUMNS}, updated_at)
+    SELECT {COPY_COLUMNS}, CURRENT_TIMESTAMP
+    FROM assembled_lemmas_staging
+    ON CONFLICT (source_image_ids, entry_number, version) DO UPDATE SET
+        lemma = EXCLUDED.lemma,
+        entry_number = EXCLUDED.entry_number,
+        type = EXCLUDED.type,
+        greek_text = EXCLUDED.greek_text,
+        confidence = EXCLUDED.confidence,
+        version = EXCLUDED.version,
+        updated_at = CURRENT_TIMESTAMP,
+        translated = 0,
+        translation = NULL,
+        translation_json = NULL,
+        translation_tokens = 0,
+        translated_at = NULL,
+        volume_number = COALESCE(EXCLUDED.volume_number, assembled_lemmas.volume_number),
+        volume_label = COALESCE(EXCLUDED.volume_label, assembled_lemmas.volume_label),
+        letter_range = COALESCE(EXCLUDED.letter_range, assembled_lemmas.letter_range),
+        ocr_generation_id = COALESCE(EXCLUDED.ocr_generation_id, assembled_lemmas.ocr_generation_id),
+        ocr_processed_at = COALESCE(EXCLUDED.ocr_processed_at, assembled_lemmas.ocr_processed_at),
+        nodegoat_id = COALESCE(EXCLUDED.nodegoat_id, assembled_lemmas.nodegoat_id),
+        meineke_id = COALESCE(EXCLUDED.meineke_id, assembled_lemmas.meineke_id),
+        billerbeck_id = COALESCE(EXCLUDED.billerbeck_id, assembled_lemmas.billerbeck_id)
+    RETURNING id, source_image_ids
+"""
 
 
-def upsert_assembled(cur, assembled_entries):
+def copy_rows(cur, table, rows):
+    """COPY parameter tuples (in COPY_COLUMNS order) into table as CSV."""
+    buf = io.StringIO()
+    # QUOTE_NOTNULL leaves only None unquoted, which COPY's CSV format reads
+    # as NULL while "" stays an empty string.
+    csv.writer(buf, quoting=csv.QUOTE_NOTNULL, lineterminator="\n").writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def build_assembled_rows(assembled_entries):
     """
-    Upsert assembled lemma entries into the database.
+    Convert assembled entries into assembled_lemmas parameter tuples.
 
-    Also populates the lemma_images junction table for normalized image tracking.
-    Keeps source_image_ids JSON for backward compatibility during migration.
+    Columns follow COPY_COLUMNS. Returns (rows, image_ids_by_json), where the
+    second maps each source_image_ids JSON string back to its id list.
     """
-    upserts = 0
+    rows = []
+    row_index = {}  # conflict key -> position in rows
+    json_by_ids = {}
+    image_ids_by_json = {}
     for entry in assembled_entries:
-        source_ids_json = json.dumps(entry["source_image_ids"])
-        # assembled_json is deprecated but kept for backward compatibility
-        assembled_json = json.dumps(
-            {
-                "lemma": entry["lemma"],
-                "entry_number": entry["entry_number"],
-                "type": entry["type"],
-                "greek_text": entry["greek_text"],
-                "confidence": entry["confidence"],
-                "source_image_ids": entry["source_image_ids"],
-            },
-            ensure_ascii=False,
-        )
-        ocr_processed_at = entry.get("ocr_processed_at")
-        if isinstance(ocr_processed_at, datetime):
-            ocr_processed_at = ocr_processed_at.isoformat()
+        # source_image_ids is part of the upsert conflict key, so it must keep
+        # the stdlib json.dumps formatting of existing rows. Entries from the
+        # same page share one id list, so serialize each distinct list once.
+        image_ids = tuple(entry["source_image_ids"])
+        source_ids_json = json_by_ids.get(image_ids)
+        if source_ids_json is None:
+            source_ids_json = json.dumps(entry["source_image_ids"])
+            json_by_ids[image_ids] = source_ids_json
+            image_ids_by_json[source_ids_json] = entry["source_image_ids"]
 
         params = (
             entry["lemma"],
@@ -228,76 +338,99 @@ def upsert_assembled(cur, assembled_entries):
             entry["confidence"],
             entry.get("version"),
             source_ids_json,
-            assembled_json,
             entry.get("volume_number"),
             entry.get("volume_label"),
             entry.get("letter_range"),
             entry.get("ocr_generation_id"),
-            ocr_processed_at,
+            entry.get("ocr_processed_at"),
             entry.get("nodegoat_id"),
             entry.get("meineke_id"),
             entry.get("billerbeck_id"),
         )
-        try:
-            sql = cur.mogrify(
-                """
-            INSERT INTO assembled_lemmas
-            (lemma, entry_number, type, greek_text, confidence, version, source_image_ids, assembled_json, updated_at,
-             volume_number, volume_label, letter_range, ocr_generation_id, ocr_processed_at,
-             nodegoat_id, meineke_id, billerbeck_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (source_image_ids, entry_number, version) DO UPDATE SET
-                lemma = EXCLUDED.lemma,
-                entry_number = EXCLUDED.entry_number,
-                type = EXCLUDED.type,
-                greek_text = EXCLUDED.greek_text,
-                confidence = EXCLUDED.confidence,
-                version = EXCLUDED.version,
-                assembled_json = EXCLUDED.assembled_json,
-                updated_at = CURRENT_TIMESTAMP,
-                translated = 0,
-                translation = NULL,
-                translation_json = NULL,
-                translation_tokens = 0,
-                translated_at = NULL,
-                volume_number = COALESCE(EXCLUDED.volume_number, assembled_lemmas.volume_number),
-                volume_label = COALESCE(EXCLUDED.volume_label, assembled_lemmas.volume_label),
-                letter_range = COALESCE(EXCLUDED.letter_range, assembled_lemmas.letter_range),
-                ocr_generation_id = COALESCE(EXCLUDED.ocr_generation_id, assembled_lemmas.ocr_generation_id),
-                ocr_processed_at = COALESCE(EXCLUDED.ocr_processed_at, assembled_lemmas.ocr_processed_at),
-                nodegoat_id = COALESCE(EXCLUDED.nodegoat_id, assembled_lemmas.nodegoat_id),
-                meineke_id = COALESCE(EXCLUDED.meineke_id, assembled_lemmas.meineke_id),
-                billerbeck_id = COALESCE(EXCLUDED.billerbeck_id, assembled_lemmas.billerbeck_id)
-            RETURNING id
+
+        # Postgres rejects a statement that updates the same row twice, so a
+        # repeated conflict key keeps only the later entry (as the old per-row
+        # upsert effectively did). NULL entry_numbers never conflict.
+        key = (source_ids_json, entry["entry_number"], entry.get("version"))
+        if entry["entry_number"] is not None and key in row_index:
+            rows[row_index[key]] = params
+        else:
+            row_index[key] = len(rows)
+            rows.append(params)
+
+    return rows, image_ids_by_json
+
+
+def upsert_assembled(cur, assembled_entries):
+    """
+    Upsert assembled lemma entries into the database.
+
+    Rows are COPYed into a temporary staging table and merged with a single
+    INSERT ... SELECT ... ON CONFLICT, so the whole batch costs two round trips.
+    Also populates the lemma_images junction table for normalized image tracking.
+    Keeps source_image_ids JSON for backward compatibility during migration.
+    """
+    rows, image_ids_by_json = build_assembled_rows(assembled_entries)
+
+    cur.execute("DROP TABLE IF EXISTS assembled_lemmas_staging")
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE assembled_lemmas_staging ON COMMIT DROP AS
+        SELECT {COPY_COLUMNS} FROM assembled_lemmas WITH NO DATA
+        """
+    )
+    copy_rows(cur, "assembled_lemmas_staging", rows)
+    cur.execute(UPSERT_SQL)
+    results = cur.fetchall()
+
+    # Update junction table for normalized image tracking
+    lemma_ids = []
+    links = {}
+    for lemma_id, source_ids_json in results:
+        lemma_ids.append(lemma_id)
+        for position, image_id in enumerate(image_ids_by_json[source_ids_json]):
+            links[(lemma_id, image_id)] = position
+
+    if lemma_ids:
+        # Clear existing links for these lemmas (in case of update)
+        cur.execute("DELETE FROM lemma_images WHERE lemma_id = ANY(%s)", (lemma_ids,))
+        execute_values(
+            cur,
+            """
+            INSERT INTO lemma_images (lemma_id, image_id, position)
+            VALUES %s
+            ON CONFLICT (lemma_id, image_id) DO UPDATE SET position = EXCLUDED.position
             """,
-                params,
-            )
-        except TypeError:
-            print("Params length:", len(params))
-            print("Params content:", params)
-            print("Entry:", entry)
-            raise
-        cur.execute(sql)
-        result = cur.fetchone()
-        lemma_id = result[0] if result else None
-
-        # Update junction table for normalized image tracking
-        if lemma_id and entry["source_image_ids"]:
-            # Clear existing links for this lemma (in case of update)
-            cur.execute("DELETE FROM lemma_images WHERE lemma_id = %s", (lemma_id,))
-            # Insert new links
-            for position, image_id in enumerate(entry["source_image_ids"]):
-                cur.execute(
-                    """
-                    INSERT INTO lemma_images (lemma_id, image_id, position)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (lemma_id, image_id) DO UPDATE SET position = EXCLUDED.position
-                    """,
-                    (lemma_id, image_id, position)
-                )
-
-        upserts += 1
-    return upserts
+            [(lemma_id, image_id, position) for (lemma_id, image_id), position in links.items()],
+            page_size=UPSERT_PAGE_SIZE,
+        )
+
+    return len(rows)
+
+
+def copy_assembled(cur, assembled_entries):
+    """
+    Bulk-load assembled lemma entries with COPY.
+
+    Only valid after --rebuild has emptied assembled_lemmas (which also
+    cascades to lemma_images): nothing can conflict, so the upsert is skipped
+    and the lemma_images links are rebuilt from source_image_ids in SQL.
+    """
+    rows, _ = build_assembled_rows(assembled_entries)
+    copy_rows(cur, "assembled_lemmas", rows)
+
+    cur.execute(
+        """
+        INSERT INTO lemma_images (lemma_id, image_id, position)
+        SELECT a.id, e.image_id::int, e.ordinality - 1
+        FROM assembled_lemmas a
+        CROSS JOIN LATERAL jsonb_array_elements_text(a.source_image_ids::jsonb)
+            WITH ORDINALITY AS e(image_id, ordinality)
+        ON CONFLICT (lemma_id, image_id) DO UPDATE SET position = EXCLUDED.position
+        """
+    )
+
+    return len(rows)
 
 
 def main():
@@ -306,33 +439,37 @@ def main():
     args = parser.parse_args()
 
     conn = get_connection()
-    cur = conn.cursor()
-
-    ensure_volume_columns(cur)
-    ensure_table(cur)
-    headword_lookup = load_headword_lookup(cur)
-
-    if args.rebuild:
-        cur.execute("DELETE FROM assembled_lemmas")
+    try:
+        cur = conn.cursor()
+
+        ensure_volume_columns(cur)
+        ensure_table(cur)
+        headword_lookup = load_headword_lookup(cur)
+
+        if args.rebuild:
+            cur.execute("DELETE FROM assembled_lemmas")
+            conn.commit()
+            print("Cleared existing assembled lemmas.")
+
+        rows = load_processed_images(cur)
+        assembled_entries, image_count = build_assembled_entries(rows, headword_lookup)
+        print(f"Loaded {image_count} processed images.")
+        rows.close()
+
+        if not assembled_entries:
+            print("No assembled lemmas found.")
+            return
+
+        if args.rebuild:
+            upserts = copy_assembled(cur, assembled_entries)
+        else:
+            upserts = upsert_assembled(cur, assembled_entries)
         conn.commit()
-        print("Cleared existing assembled lemmas.")
 
-    rows = load_processed_images(cur)
-    print(f"Loaded {len(rows)} processed images.")
-
-    assembled_entries = build_assembled_entries(rows, headword_lookup)
-    if not assembled_entries:
-        print("No assembled lemmas found.")
+        print(f"Assembled {len(assembled_entries)} lemmas.")
+        print(f"Upserts: {upserts}")
+    finally:
         conn.close()
-        return
-
-    upserts = upsert_assembled(cur, assembled_entries)
-    conn.commit()
-
-    print(f"Assembled {len(assembled_entries)} lemmas.")
-    print(f"Upserts: {upserts}")
-
-    conn.close()
 
 
 if __name__ == "__main__":
@@ -2,9 +2,70 @@
 """
 Backfill existing images in the database with BLOB data.
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+
+from psycopg2.extras import execute_batch
+
 from db import get_connection
 
+# Images per UPDATE batch/commit. Each row carries a full page image, so
+# this also bounds how many blobs are held in memory at once.
+BATCH_SIZE = 100
+
+# Rows per UPDATE statement sent by execute_batch. Each statement embeds its
+# images as escaped bytea literals (about twice the raw size), so keep it to
+# a few pages; the batch as a whole still commits once.
+UPDATE_PAGE_SIZE = 5
+
+# Threads reading image files from disk
+READ_WORKERS = 8
+
+# Anything not listed is stored as JPEG
+MIME_TYPES_BY_SUFFIX = {
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+UPDATE_SQL = """
+    UPDATE images
+    SET image_data = %s, image_mime_type = %s
+    WHERE id = %s
+"""
+
+
+PDF_PAGES_DIR = Path.home() / "stephanos" / "pdf_pages"
+
+_pdf_pages_index = None
+
+
+def pdf_pages_index() -> dict[str, Path]:
+    """
+    Map filename -> path for images under pdf_pages and its volume
+    subdirectories (vol1, vol2, etc.), scanning the tree once.
+
+    Files directly in pdf_pages take precedence over subdirectories.
+    """
+    global _pdf_pages_index
+    if _pdf_pages_index is None:
+        index = {}
+        subdirs = []
+        if PDF_PAGES_DIR.is_dir():
+            with os.scandir(PDF_PAGES_DIR) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        subdirs.append(entry.path)
+                    else:
+                        index[entry.name] = Path(entry.path)
+            for subdir in subdirs:
+                with os.scandir(subdir) as entries:
+                    for entry in entries:
+                        index.setdefault(entry.name, Path(entry.path))
+        _pdf_pages_index = index
+    return _pdf_pages_index
+
 
 def find_image_file(image_filename: str, image_dir: str = None) -> Path | None:
     """Try to locate an image file on disk"""
@@ -14,22 +75,40 @@ def find_image_file(image_filename: str, image_dir: str = None) -> Path | None:
         if path.exists():
             return path
 
-    # Try pdf_pages/vol1, pdf_pages/vol2, etc.
-    pdf_pages = Path.home() / "stephanos" / "pdf_pages"
-    if pdf_pages.exists():
-        # Try direct path
-        path = pdf_pages / image_filename
-        if path.exists():
-            return path
+    # Fall back to pdf_pages, pdf_pages/vol1, pdf_pages/vol2, etc.
+    return pdf_pages_index().get(image_filename)
+
+
+def read_image(row):
+    """
+    Locate and read one image row.
+
+    Returns (image_id, image_filename, image_path, image_data, mime_type, error);
+    image_path is None if the file wasn't found.
+    """
+    image_id, image_filename, image_dir = row
+    image_path = find_image_file(image_filename, image_dir)
+    if not image_path:
+        return image_id, image_filename, None, None, None, None
+
+    try:
+        image_data = image_path.read_bytes()
+    except Exception as e:
+        return image_id, image_filename, image_path, None, None, e
 
-        # Try subdirectories (vol1, vol2, etc.)
-        for subdir in pdf_pages.iterdir():
-            if subdir.is_dir():
-                path = subdir / image_filename
-                if path.exists():
-                    return path
+    mime_type = MIME_TYPES_BY_SUFFIX.get(image_path.suffix.lower(), 'image/jpeg')
+    return image_id, image_filename, image_path, image_data, mime_type, None
 
-    return None
+
+def flush_batch(conn, cur, batch):
+    """Write a batch of (image_data, mime_type, image_id) rows and commit once."""
+    if not batch:
+        return 0
+    execute_batch(cur, UPDATE_SQL, batch, page_size=UPDATE_PAGE_SIZE)
+    conn.commit()
+    count = len(batch)
+    batch.clear()
+    return count
 
 
 def backfill_images(conn, cur):
@@ -54,47 +133,34 @@ def backfill_images(conn, cur):
 
     updated = 0
     not_found = 0
+    batch = []
+
+    # Reads release the GIL, so a small pool reads files in parallel. The next
+    # batch is submitted before the current one is written, overlapping disk
+    # I/O with the UPDATEs while holding at most two batches of blobs.
+    chunks = [rows[offset:offset + BATCH_SIZE] for offset in range(0, len(rows), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        pending = executor.map(read_image, chunks[0])
+        for next_chunk in chunks[1:] + [None]:
+            results = list(pending)
+            if next_chunk:
+                pending = executor.map(read_image, next_chunk)
+
+            for image_id, image_filename, image_path, image_data, mime_type, error in results:
+                if not image_path:
+                    print(f"Warning: Could not find {image_filename}")
+                    not_found += 1
+                    continue
+
+                if error:
+                    print(f"Error reading {image_filename}: {error}")
+                    continue
+
+                batch.append((image_data, mime_type, image_id))
+
+            updated += flush_batch(conn, cur, batch)
+            print(f"Updated {updated}/{len(rows)} images...")
 
-    for image_id, image_filename, image_dir in rows:
-        image_path = find_image_file(image_filename, image_dir)
-
-        if not image_path:
-            print(f"Warning: Could not find {image_filename}")
-            not_found += 1
-            continue
-
-        try:
-            image_data = image_path.read_bytes()
-
-            # Determine MIME type
-            mime_type = 'image/jpeg'
-            ext = image_path.suffix.lower()
-            if ext == '.png':
-                mime_type = 'image/png'
-            elif ext == '.gif':
-                mime_type = 'image/gif'
-            elif ext == '.webp':
-                mime_type = 'image/webp'
-
-            cur.execute(
-                """
-                UPDATE images
-                SET image_data = %s, image_mime_type = %s
-                WHERE id = %s
-                """,
-                (image_data, mime_type, image_id)
-            )
-
-            updated += 1
-
-            if updated % 10 == 0:
-                print(f"Updated {updated}/{len(rows)} images...")
-                conn.commit()
-
-        except Exception as e:
-            print(f"Error updating {image_filename}: {e}")
-
-    conn.commit()
     print(f"\nBackfill complete:")
     print(f"  Updated: {updated}")
     print(f"  Not found: {not_found}")
@@ -102,11 +168,12 @@ def backfill_images(conn, cur):
 
 def main():
     conn = get_connection()
-    cur = conn.cursor()
-
-    backfill_images(conn, cur)
+    try:
+        cur = conn.cursor()
 
-    conn.close()
+        backfill_images(conn, cur)
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
@@ -7,18 +7,25 @@ Usage:
   uv run batch_process.py                         # Process with OpenAI (default)
   uv run batch_process.py --provider gemini       # Process with Gemini
   uv run batch_process.py --limit 10              # Process max 10 images
+  uv run batch_process.py --concurrency 4         # Keep 4 OCR requests in flight
+  uv run batch_process.py --no-ocr-cache          # Re-OCR pages even if the result is cached
 """
 import argparse
+import hashlib
 import json
+import os
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from openai import OpenAI
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
 from process_image import (
     DEFAULT_GENERATION_NAME,
     DEFAULT_PROVIDER,
     DEFAULT_GEMINI_MODEL,
+    OCR_PROMPT_CACHE_KEY,
     load_api_key,
     load_gemini_api_key,
     process_image_with_model,
@@ -30,25 +37,87 @@ from process_image import (
 )
 from db import get_connection
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DEFAULT_OCR_DAILY_TOKEN_LIMIT = 100_000
 DEFAULT_MODEL = "gemini-3.0-flash"
+DEFAULT_TOKENS_PER_MINUTE = 60_000
+
+# Starting guess for one page's OCR tokens, refined as results come in
+INITIAL_TOKENS_PER_IMAGE = 4_000
+TOKEN_ESTIMATE_SMOOTHING = 0.2
+
+
+class TokenBucket:
+    """
+    Client-side mirror of the provider's per-minute token limit.
+
+    acquire(n) takes n tokens when they are available and otherwise returns
+    how long to wait for them, so the caller can keep collecting results in
+    the meantime; penalize() drains the bucket after a 429 so the next
+    requests back off instead of piling onto the limit.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, n):
+        """Take n tokens and return 0, or return the seconds until n are available (taking none)."""
+        n = min(n, self.capacity)
+        self._refill()
+        if self.tokens < n:
+            return (n - self.tokens) / self.rate
+        self.tokens -= n
+        return 0
+
+    def adjust(self, n):
+        """Charge (or refund, if negative) the gap between estimated and actual usage."""
+        self.tokens -= n
+
+    def penalize(self):
+        self._refill()
+        self.tokens = min(-1, self.tokens - self.rate)
+
+
+def dumps_lemma_json(entries):
+    """Serialize OCR entries for images.lemma_json, keeping Greek as UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(entries).decode()
+    return json.dumps(entries, ensure_ascii=False)
+
+
+def is_rate_limit_error(exc):
+    """True for a 429 from either provider (OpenAI status_code / Gemini code)."""
+    return getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429
+
 
 def get_ocr_tokens_used_today(cur):
     """Get total OCR tokens used today (from images table)"""
-    today = datetime.now(timezone.utc).date().isoformat()
+    today = datetime.now(timezone.utc).date()
     cur.execute(
         """
         SELECT COALESCE(SUM(tokens_used), 0)
         FROM images
-        WHERE DATE(processed_at) = %s
+        WHERE processed_at >= %s AND processed_at < %s
         """,
-        (today,)
+        (today, today + timedelta(days=1))
     )
     row = cur.fetchone()
     return row[0] if row else 0
 
 def fetch_unprocessed_images(cur):
-    """Fetch all unprocessed images with their image data from database"""
+    """Fetch metadata for all unprocessed images (image data is loaded per image)"""
     cur.execute(
         """
         SELECT
@@ -57,8 +126,7 @@ def fetch_unprocessed_images(cur):
             COALESCE(h.image_dir, i.image_dir) AS image_dir,
             COALESCE(i.volume_number, e.volume_number, p.volume_number) AS volume_number,
             COALESCE(i.volume_label, e.volume_label, p.volume_label) AS volume_label,
-            COALESCE(i.letter_range, e.letter_range, p.letter_range) AS letter_range,
-            i.image_data
+            COALESCE(i.letter_range, e.letter_range, p.letter_range) AS letter_range
         FROM images i
         LEFT JOIN html_files h ON i.html_file_id = h.id
         LEFT JOIN epubs e ON h.epub_id = e.id
@@ -70,8 +138,96 @@ def fetch_unprocessed_images(cur):
     )
     return cur.fetchall()
 
-def mark_processed(conn, cur, image_id, lemma_json, tokens_used, model, generation_id,
+def fetch_image_data(cur, image_id):
+    """Fetch the stored image BLOB for one image (None if not backfilled)"""
+    cur.execute("SELECT image_data FROM images WHERE id = %s", (image_id,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def image_file_exists(dir_listings, image_dir: Path, image_filename: str) -> bool:
+    """
+    Check for an image file using one directory listing per image_dir
+    (cached in dir_listings) instead of a stat() per image.
+
+    Names missing from the listing are re-checked on disk, in case the file
+    appeared after the directory was listed.
+    """
+    key = str(image_dir)
+    names = dir_listings.get(key)
+    if names is None:
+        try:
+            names = set(os.listdir(image_dir))
+        except OSError:
+            names = set()
+        dir_listings[key] = names
+    if image_filename in names:
+        return True
+    return (image_dir / image_filename).exists()
+
+def ensure_ocr_cache_table(cur):
+    """
+    OCR results keyed by page content and everything else sent with it, so
+    identical image bytes are only sent again when the model, generation,
+    prompt or headword window has changed.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            image_hash BYTEA NOT NULL,
+            model TEXT NOT NULL,
+            generation_id INTEGER NOT NULL,
+            prompt_key TEXT NOT NULL,
+            context_hash BYTEA NOT NULL,
+            lemma_json TEXT NOT NULL,
+            tokens_used INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (image_hash, model, generation_id, prompt_key, context_hash)
+        )
+        """
+    )
+
+def hash_image(image_data):
+    return hashlib.blake2b(image_data, digest_size=32).digest()
+
+def hash_ocr_context(volume_meta, allowed_headwords):
+    """Hash the page-specific part of the OCR prompt: the volume and its headword window"""
+    context = [
+        volume_meta,
+        [(item["greek_headword"], item["nodegoat_id"]) for item in allowed_headwords],
+    ]
+    encoded = json.dumps(context, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=32).digest()
+
+def fetch_cached_ocr(cur, image_hash, model, generation_id, context_hash):
+    """Return the cached lemma_json for these image bytes and this request, or None"""
+    cur.execute(
+        """
+        SELECT lemma_json
+        FROM ocr_cache
+        WHERE image_hash = %s AND model = %s AND generation_id = %s
+          AND prompt_key = %s AND context_hash = %s
+        """,
+        (image_hash, model, generation_id, OCR_PROMPT_CACHE_KEY, context_hash)
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def store_cached_ocr(cur, image_hash, model, generation_id, context_hash, lemma_json, tokens_used):
+    cur.execute(
+        """
+        INSERT INTO ocr_cache (image_hash, model, generation_id, prompt_key, context_hash, lemma_json, tokens_used)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (image_hash, model, generation_id, prompt_key, context_hash) DO UPDATE
+        SET lemma_json = EXCLUDED.lemma_json,
+            tokens_used = EXCLUDED.tokens_used,
+            created_at = CURRENT_TIMESTAMP
+        """,
+        (image_hash, model, generation_id, OCR_PROMPT_CACHE_KEY, context_hash, lemma_json, tokens_used)
+    )
+
+def mark_processed(cur, image_id, lemma_json, tokens_used, model, generation_id,
                    first_headword=None, last_headword=None):
+    """Record an image's OCR result; the caller commits (see --commit-every)"""
     cur.execute(
         """
         UPDATE images
@@ -85,10 +241,20 @@ def mark_processed(conn, cur, image_id, lemma_json, tokens_used, model, generati
             ocr_last_headword = %s
         WHERE id = %s
         """,
-        (lemma_json, datetime.now(timezone.utc).isoformat(), tokens_used, model, generation_id,
+        (lemma_json, datetime.now(timezone.utc), tokens_used, model, generation_id,
          first_headword, last_headword, image_id)
     )
-    conn.commit()
+
+def model_for_budget(args, tokens_today):
+    """
+    Pick the OCR model for today's token total: --model under the daily limit,
+    then --fallback-model (if set) until --hard-token-limit. None once spent.
+    """
+    if tokens_today < args.ocr_daily_token_limit:
+        return args.model
+    if args.fallback_model and tokens_today < args.hard_token_limit:
+        return args.fallback_model
+    return None
 
 def main():
     parser = argparse.ArgumentParser()
@@ -96,15 +262,34 @@ def main():
     parser.add_argument("--limit", type=int, help="Max number of images to process in this run")
     parser.add_argument("--ocr-daily-token-limit", type=int, default=DEFAULT_OCR_DAILY_TOKEN_LIMIT,
                        help=f"Daily OCR token limit for Gemini/OpenAI vision (default: {DEFAULT_OCR_DAILY_TOKEN_LIMIT:,})")
-    parser.add_argument("--delay", type=float, default=1.0,
-                       help="Delay in seconds between API calls (default: 1.0)")
+    parser.add_argument("--tokens-per-minute", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                       help=f"Provider per-minute token limit to pace requests against (default: {DEFAULT_TOKENS_PER_MINUTE:,})")
+    parser.add_argument("--concurrency", type=int, default=1,
+                       help="Number of OCR requests to run at once (default: 1)")
+    parser.add_argument("--commit-every", type=int, default=10,
+                       help="Commit saved OCR results every N images (default: 10)")
     parser.add_argument("--provider", default=DEFAULT_PROVIDER, choices=["openai", "gemini"],
                        help=f"API provider to use (default: {DEFAULT_PROVIDER})")
     parser.add_argument("--model",
                        help=f"Model to use for OCR (default: gpt-5.1 for openai, gemini-2.5-flash for gemini)")
+    parser.add_argument("--fallback-model",
+                       help="Cheaper model to switch to once the daily token limit is reached (default: stop instead)")
+    parser.add_argument("--hard-token-limit", type=int,
+                       help="Total daily OCR tokens at which the fallback model stops too (required with --fallback-model)")
+    parser.add_argument("--no-ocr-cache", action="store_true",
+                       help="Send every page to the provider even if an identical request is cached "
+                            "(e.g. to force a re-OCR of pages reset to processed = 0)")
     parser.add_argument("--ocr-generation",
                        help='OCR generation label (default: auto-detected from provider)')
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.commit_every < 1:
+        parser.error("--commit-every must be at least 1")
+    if args.tokens_per_minute < 1:
+        parser.error("--tokens-per-minute must be at least 1")
+    if args.fallback_model and args.hard_token_limit is None:
+        parser.error("--fallback-model requires --hard-token-limit")
 
     # Set defaults based on provider
     if args.model is None:
@@ -121,143 +306,255 @@ def main():
         raise FileNotFoundError(default_image_dir)
 
     conn = get_connection()
-    cur = conn.cursor()
-    ensure_ocr_generation_table(cur)
-    generation_descriptions = {
-        "simple request": "Original OCR without headword constraints",
-        "headword constrained": "OCR constrained to Meineke headword list for the volume (OpenAI gpt-5.1)",
-        "gemini-constrained": "OCR constrained to Meineke headword list for the volume (Gemini 2.5 Flash)",
-    }
-    generation_id = get_or_create_generation(
-        cur, args.ocr_generation, generation_descriptions.get(args.ocr_generation, args.ocr_generation)
-    )
-
-    # Check OCR tokens used today
-    tokens_today = get_ocr_tokens_used_today(cur)
-    print(f"OCR tokens used today: {tokens_today:,} / {args.ocr_daily_token_limit:,}")
-
-    if tokens_today >= args.ocr_daily_token_limit:
-        print("Daily OCR token limit reached. Exiting.")
-        conn.close()
-        return
-
-    # Get unprocessed images
-    unprocessed = fetch_unprocessed_images(cur)
-    print(f"Unprocessed images: {len(unprocessed)}")
-
-    if not unprocessed:
-        print("No unprocessed images found.")
-        conn.close()
-        return
-
-    # Load API key and client for OpenAI provider
-    client = None
-    if args.provider == "openai":
-        api_key = load_api_key()
-        client = OpenAI(api_key=api_key)
-
-    # Process images
-    processed_count = 0
-    total_tokens_this_run = 0
-
-    for image_id, image_filename, db_image_dir, vol_number, vol_label, letter_range, image_data in unprocessed:
-        # Check if we've hit the limit
-        if args.limit and processed_count >= args.limit:
-            print(f"Reached processing limit ({args.limit} images).")
-            break
-
-        # Check daily OCR token limit
-        current_tokens_today = tokens_today + total_tokens_this_run
-        if current_tokens_today >= args.ocr_daily_token_limit:
-            print(f"Daily OCR token limit reached ({current_tokens_today:,} tokens).")
-            break
-
-        # Use image data from database if available, otherwise fall back to file system
-        if not image_data:
-            # Legacy fallback: read from file system
-            image_dir = Path(db_image_dir) if db_image_dir else default_image_dir
-            if not image_dir:
-                print(f"Warning: No image directory or BLOB data for {image_filename}, skipping")
-                continue
-
-            image_path = image_dir / image_filename
-            if not image_path.exists():
-                print(f"Warning: Image not found: {image_path}")
-                continue
-
-            image_data = image_path.read_bytes()
-
-        volume_meta = None
-        if vol_number or vol_label or letter_range:
-            volume_meta = {
-                "volume_number": vol_number,
-                "volume_label": vol_label,
-                "letter_range": letter_range,
-            }
-
-        # Smart headword selection: get next 50 headwords after previous image's last lemma
-        start_after = None
-        if volume_meta:
-            prev_last_lemma = get_previous_image_last_lemma(cur, image_id, vol_number)
-            if prev_last_lemma:
-                start_after = prev_last_lemma
-
-        allowed_headwords = load_allowed_headwords(cur, volume_meta, start_after_headword=start_after, limit=50) if volume_meta else []
-
-        # Track the first and last headwords we're sending
-        first_headword = allowed_headwords[0]["greek_headword"] if allowed_headwords else None
-        last_headword = allowed_headwords[-1]["greek_headword"] if allowed_headwords else None
-
-        print(f"Processing {image_filename} ({processed_count + 1}/{len(unprocessed)}, {len(allowed_headwords)} headwords)...", end=" ", flush=True)
-
+    try:
+        cur = conn.cursor()
+        ensure_ocr_generation_table(cur)
+        ensure_ocr_cache_table(cur)
+        generation_descriptions = {
+            "simple request": "Original OCR without headword constraints",
+            "headword constrained": "OCR constrained to Meineke headword list for the volume (OpenAI gpt-5.1)",
+            "gemini-constrained": "OCR constrained to Meineke headword list for the volume (Gemini 2.5 Flash)",
+        }
+        generation_id = get_or_create_generation(
+            cur, args.ocr_generation, generation_descriptions.get(args.ocr_generation, args.ocr_generation)
+        )
+
+        # Check OCR tokens used today
+        tokens_today = get_ocr_tokens_used_today(cur)
+        print(f"OCR tokens used today: {tokens_today:,} / {args.ocr_daily_token_limit:,}")
+
+        model = model_for_budget(args, tokens_today)
+        if model is None:
+            print("Daily OCR token limit reached. Exiting.")
+            return
+        if model != args.model:
+            print(f"Daily OCR token limit reached; using fallback model {model} "
+                  f"(hard limit: {args.hard_token_limit:,}).")
+
+        # Get unprocessed images
+        unprocessed = fetch_unprocessed_images(cur)
+        print(f"Unprocessed images: {len(unprocessed)}")
+
+        if not unprocessed:
+            print("No unprocessed images found.")
+            return
+
+        # Load API key and client for OpenAI provider
+        client = None
+        if args.provider == "openai":
+            api_key = load_api_key()
+            client = OpenAI(api_key=api_key)
+
+        # Process images. OCR requests run on a worker pool (--concurrency);
+        # database reads and writes stay on this thread and this connection.
+        processed_count = 0
+        total_tokens_this_run = 0
+        submitted_count = 0
+        rate_limiter = TokenBucket(args.tokens_per_minute)
+        estimated_tokens = INITIAL_TOKENS_PER_IMAGE
+        in_flight = {}
+        pending_images = iter(unprocessed)
+        stop_submitting = False
+        tokens_reserved = False
+        dir_listings = {}
+
+        # Saved results are committed every --commit-every images; whatever is
+        # left is committed at the end, including on Ctrl-C (unless a database
+        # error has aborted the transaction)
+        uncommitted = 0
         try:
-            # Process image with specified provider
-            if args.provider == "gemini":
-                entries, tokens_used = process_image_with_gemini(
-                    model_name=args.model,
-                    volume_meta=volume_meta,
-                    allowed_headwords=allowed_headwords,
-                    image_data=image_data,
-                )
-            else:  # openai
-                entries, tokens_used = process_image_with_model(
-                    client,
-                    model=args.model,
-                    volume_meta=volume_meta,
-                    allowed_headwords=allowed_headwords,
-                    image_data=image_data,
-                )
-
-            # Save to database
-            mark_processed(
-                conn,
-                cur,
-                image_id,
-                json.dumps(entries, ensure_ascii=False),
-                tokens_used,
-                args.model,
-                generation_id,
-                first_headword=first_headword,
-                last_headword=last_headword,
-            )
-
-            processed_count += 1
-            total_tokens_this_run += tokens_used
-            print(f"OK (tokens: {tokens_used:,}, total today: {tokens_today + total_tokens_this_run:,})")
-
-            # Delay between requests
-            if args.delay > 0:
-                time.sleep(args.delay)
-
-        except Exception as e:
-            print(f"FAILED ({type(e).__name__}: {e})")
-            continue
-
-    conn.close()
-    print(f"\nBatch complete:")
-    print(f"  Processed: {processed_count} images")
-    print(f"  Tokens this run: {total_tokens_this_run:,}")
-    print(f"  Total tokens today: {tokens_today + total_tokens_this_run:,}")
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                while True:
+                    rate_wait = 0
+                    while not stop_submitting and len(in_flight) < args.concurrency:
+                        # Check if we've hit the limit
+                        if args.limit and processed_count >= args.limit:
+                            print(f"Reached processing limit ({args.limit} images).")
+                            stop_submitting = True
+                            break
+                        # Requests in flight may still fail, so wait for them before topping up
+                        if args.limit and processed_count + len(in_flight) >= args.limit:
+                            break
+
+                        # Reserve room under the per-minute token limit for the next request.
+                        # The reservation carries over pages that end up not being sent.
+                        if not tokens_reserved:
+                            rate_wait = rate_limiter.acquire(estimated_tokens)
+                            if rate_wait:
+                                break
+                            tokens_reserved = True
+
+                        row = next(pending_images, None)
+                        if row is None:
+                            stop_submitting = True
+                            break
+                        image_id, image_filename, db_image_dir, vol_number, vol_label, letter_range = row
+
+                        # Check daily OCR token limit, switching to the fallback model if configured
+                        current_tokens_today = tokens_today + total_tokens_this_run
+                        budget_model = model_for_budget(args, current_tokens_today)
+                        if budget_model is None:
+                            limit_name = "Hard" if args.fallback_model else "Daily"
+                            print(f"{limit_name} OCR token limit reached ({current_tokens_today:,} tokens).")
+                            stop_submitting = True
+                            break
+                        if budget_model != model:
+                            print(f"Daily OCR token limit reached ({current_tokens_today:,} tokens); "
+                                  f"switching to {budget_model}.")
+                            model = budget_model
+
+                        # Use image data from database if available, otherwise fall back to file system
+                        image_data = fetch_image_data(cur, image_id)
+                        image_path = None
+
+                        if not image_data:
+                            # Legacy fallback: read from file system
+                            image_dir = Path(db_image_dir) if db_image_dir else default_image_dir
+                            if not image_dir:
+                                print(f"Warning: No image directory or BLOB data for {image_filename}, skipping")
+                                continue
+
+                            image_path = image_dir / image_filename
+                            if not image_file_exists(dir_listings, image_dir, image_filename):
+                                print(f"Warning: Image not found: {image_path}")
+                                continue
+
+                            # The worker reads the file, overlapping the read with requests in flight
+                            image_data = None
+
+                        volume_meta = None
+                        if vol_number or vol_label or letter_range:
+                            volume_meta = {
+                                "volume_number": vol_number,
+                                "volume_label": vol_label,
+                                "letter_range": letter_range,
+                            }
+
+                        # Smart headword selection: get next 50 headwords after previous image's last lemma.
+                        # With --concurrency > 1 this is the last image already saved, which may
+                        # lag the pages still in flight.
+                        start_after = None
+                        if volume_meta:
+                            prev_last_lemma = get_previous_image_last_lemma(cur, image_id, vol_number)
+                            if prev_last_lemma:
+                                start_after = prev_last_lemma
+
+                        allowed_headwords = load_allowed_headwords(cur, volume_meta, start_after_headword=start_after, limit=50) if volume_meta else []
+
+                        # Track the first and last headwords we're sending
+                        first_headword = allowed_headwords[0]["greek_headword"] if allowed_headwords else None
+                        last_headword = allowed_headwords[-1]["greek_headword"] if allowed_headwords else None
+
+                        # Identical page bytes already OCR'd with the same model, generation,
+                        # prompt and headword window (e.g. the same scan imported twice, or a
+                        # page reset to processed = 0 without --no-ocr-cache) reuse the stored result
+                        image_hash = hash_image(image_data) if image_data else None
+                        context_hash = hash_ocr_context(volume_meta, allowed_headwords) if image_hash else None
+                        cached_json = (
+                            fetch_cached_ocr(cur, image_hash, model, generation_id, context_hash)
+                            if image_hash and not args.no_ocr_cache else None
+                        )
+                        if cached_json is not None:
+                            mark_processed(cur, image_id, cached_json, 0, model, generation_id,
+                                           first_headword=first_headword, last_headword=last_headword)
+                            processed_count += 1
+                            uncommitted += 1
+                            if uncommitted >= args.commit_every:
+                                conn.commit()
+                                uncommitted = 0
+                            print(f"{image_filename}: OK (cached OCR result, no tokens used)")
+                            continue
+
+                        tokens_reserved = False
+                        submitted_count += 1
+                        print(f"Processing {image_filename} ({submitted_count}/{len(unprocessed)}, {len(allowed_headwords)} headwords)...", flush=True)
+
+                        # Process image with specified provider
+                        if args.provider == "gemini":
+                            future = executor.submit(
+                                process_image_with_gemini,
+                                model_name=model,
+                                volume_meta=volume_meta,
+                                allowed_headwords=allowed_headwords,
+                                image_data=image_data,
+                                image_path=image_path,
+                            )
+                        else:  # openai
+                            future = executor.submit(
+                                process_image_with_model,
+                                client,
+                                model=model,
+                                volume_meta=volume_meta,
+                                allowed_headwords=allowed_headwords,
+                                image_data=image_data,
+                                image_path=image_path,
+                            )
+                        in_flight[future] = (image_id, image_filename, image_hash, context_hash, model, first_headword, last_headword, estimated_tokens)
+
+                    if not in_flight:
+                        if not rate_wait:
+                            break
+                        time.sleep(rate_wait)
+                        continue
+
+                    # While waiting for token room, keep saving results as they finish
+                    # so their usage and any 429s reach the rate limiter promptly
+                    done, _ = wait(in_flight, timeout=rate_wait or None, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        image_id, image_filename, image_hash, context_hash, image_model, first_headword, last_headword, estimate = in_flight.pop(future)
+                        # Only provider errors are caught here; a database error ends the run
+                        try:
+                            entries, tokens_used, cached_tokens = future.result()
+                        except Exception as e:
+                            if is_rate_limit_error(e):
+                                rate_limiter.penalize()
+                            print(f"{image_filename}: FAILED ({type(e).__name__}: {e})")
+                            continue
+
+                        rate_limiter.adjust(tokens_used - estimate)
+                        estimated_tokens = round(
+                            TOKEN_ESTIMATE_SMOOTHING * tokens_used
+                            + (1 - TOKEN_ESTIMATE_SMOOTHING) * estimated_tokens
+                        )
+
+                        # Save to database
+                        lemma_json = dumps_lemma_json(entries)
+                        mark_processed(
+                            cur,
+                            image_id,
+                            lemma_json,
+                            tokens_used,
+                            image_model,
+                            generation_id,
+                            first_headword=first_headword,
+                            last_headword=last_headword,
+                        )
+                        if image_hash:
+                            store_cached_ocr(cur, image_hash, image_model, generation_id, context_hash, lemma_json, tokens_used)
+
+                        processed_count += 1
+                        total_tokens_this_run += tokens_used
+                        uncommitted += 1
+                        if uncommitted >= args.commit_every:
+                            conn.commit()
+                            uncommitted = 0
+                        cache_note = f", prompt cache: {cached_tokens:,}" if cached_tokens else ""
+                        print(f"{image_filename}: OK (tokens: {tokens_used:,}{cache_note}, total today: {tokens_today + total_tokens_this_run:,})")
+        finally:
+            if conn.get_transaction_status() == TRANSACTION_STATUS_INERROR:
+                # A failed statement aborted the transaction; COMMIT would
+                # silently roll it back, so say so instead
+                conn.rollback()
+                print(f"Database error: {uncommitted} unsaved results were rolled back.")
+            else:
+                conn.commit()
+
+        print(f"\nBatch complete:")
+        print(f"  Processed: {processed_count} images")
+        print(f"  Tokens this run: {total_tokens_this_run:,}")
+        print(f"  Total tokens today: {tokens_today + total_tokens_this_run:,}")
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     main()
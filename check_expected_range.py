@@ -4,39 +4,75 @@ import json
 import sys
 from db import get_connection
 from process_image import (
-    get_volume_for_image,
-    get_previous_image_last_lemma,
+    last_lemma_from_json,
     load_allowed_headwords
 )
 
-def check_image_range(image_filename):
-    conn = get_connection()
-    cur = conn.cursor()
-
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Image row, its volume metadata and the previous processed image's
+# lemma_json in one round trip
+IMAGE_RANGE_SQL = """
+    SELECT
+        i.id,
+        i.image_filename,
+        COALESCE(i.volume_number, e.volume_number, p.volume_number) AS volume_number,
+        COALESCE(i.volume_label, e.volume_label, p.volume_label) AS volume_label,
+        COALESCE(i.letter_range, e.letter_range, p.letter_range) AS letter_range,
+        i.processed,
+        i.lemma_json,
+        i.ocr_first_headword,
+        i.ocr_last_headword,
+        prev.lemma_json AS prev_lemma_json
+    FROM images i
+    LEFT JOIN html_files h ON i.html_file_id = h.id
+    LEFT JOIN epubs e ON h.epub_id = e.id
+    LEFT JOIN pdf_files p ON i.pdf_file_id = p.id
+    LEFT JOIN LATERAL (
+        SELECT prev.lemma_json
+        FROM images prev
+        WHERE prev.volume_number = COALESCE(i.volume_number, e.volume_number, p.volume_number)
+        AND prev.id < i.id
+        AND prev.processed = 1
+        AND prev.lemma_json IS NOT NULL
+        ORDER BY prev.id DESC
+        LIMIT 1
+    ) prev ON true
+    WHERE i.image_filename = %s
+"""
+
+def check_image_range(cur, image_filename):
     # Get image metadata
-    cur.execute("SELECT id, image_filename, volume_number FROM images WHERE image_filename = %s",
-                (image_filename,))
+    cur.execute(IMAGE_RANGE_SQL, (image_filename,))
     row = cur.fetchone()
     if not row:
         print(f"Image not found: {image_filename}")
-        conn.close()
         return
 
-    image_id, image_filename, volume_number = row
+    (image_id, image_filename, volume_number, volume_label, letter_range,
+     processed, lemma_json, ocr_first, ocr_last, prev_lemma_json) = row
     print(f"\n=== Image: {image_filename} (ID: {image_id}) ===")
 
     # Get volume metadata
-    volume_meta = get_volume_for_image(cur, image_id)
-    if not volume_meta:
+    if not (volume_number or volume_label or letter_range):
         print("No volume metadata found")
-        conn.close()
         return
+    volume_meta = {
+        "volume_number": volume_number,
+        "volume_label": volume_label,
+        "letter_range": letter_range,
+    }
 
     print(f"Volume: {volume_meta.get('volume_label')} (#{volume_meta.get('volume_number')})")
     print(f"Letter range: {volume_meta.get('letter_range')}")
 
     # Get previous image's last lemma
-    prev_last_lemma = get_previous_image_last_lemma(cur, image_id, volume_meta.get("volume_number"))
+    prev_last_lemma = last_lemma_from_json(prev_lemma_json) if prev_lemma_json else None
     if prev_last_lemma:
         print(f"\nPrevious image's last lemma: {prev_last_lemma}")
     else:
@@ -51,7 +87,6 @@ def check_image_range(image_filename):
 
     if not allowed_headwords:
         print("No allowed headwords found")
-        conn.close()
         return
 
     print(f"\n=== Expected headword range ({len(allowed_headwords)} headwords) ===")
@@ -67,20 +102,13 @@ def check_image_range(image_filename):
         print(f"\n... ({len(allowed_headwords) - 10} more headwords)")
 
     # Check if this image has already been processed
-    cur.execute("""
-        SELECT processed, lemma_json, ocr_first_headword, ocr_last_headword
-        FROM images WHERE id = %s
-    """, (image_id,))
-    result = cur.fetchone()
-    processed, lemma_json, ocr_first, ocr_last = result
-
     if processed and lemma_json:
         print("\n=== Actual OCR results ===")
         print(f"OCR first headword: {ocr_first}")
         print(f"OCR last headword: {ocr_last}")
 
         try:
-            data = json.loads(lemma_json)
+            data = _json_loads(lemma_json)
             entries = data.get("entries", []) if isinstance(data, dict) else data
             if entries:
                 print(f"\nExtracted {len(entries)} lemmas:")
@@ -94,11 +122,16 @@ def check_image_range(image_filename):
     else:
         print("\n=== Image not yet processed ===")
 
-    conn.close()
-
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: uv run check_expected_range.py <image_filename>")
+        print("Usage: uv run check_expected_range.py <image_filename> [<image_filename> ...]")
         sys.exit(1)
 
-    check_image_range(sys.argv[1])
+    # One connection (and one headword load per volume) for all images
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        for image_filename in sys.argv[1:]:
+            check_image_range(cur, image_filename)
+    finally:
+        conn.close()
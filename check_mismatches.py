@@ -3,38 +3,39 @@
 
 from db import get_connection
 
+# Every character str.strip() removes, including NBSP and the thin spaces
+# common in OCR'd Greek, so BTRIM trims exactly what the Python check did
+WHITESPACE = ''.join(ch for ch in map(chr, range(0x110000)) if ch.isspace())
+
 conn = get_connection()
 cur = conn.cursor()
 
 print('Checking for mismatched lemmas...\n')
 
+# Split the headword off the Greek text (before the middle dot) and compare
+# server-side, so only mismatched rows come back
 cur.execute('''
-    SELECT id, lemma, entry_number, type, greek_text, source_image_ids
-    FROM assembled_lemmas
+    SELECT id, entry_number, lemma, headword, LEFT(greek_text, 200)
+    FROM (
+        SELECT id, entry_number, lemma, greek_text,
+               BTRIM(SPLIT_PART(greek_text, '·', 1), %s) AS headword
+        FROM assembled_lemmas
+        WHERE STRPOS(greek_text, '·') > 1
+    ) split
+    WHERE lemma IS DISTINCT FROM headword
     ORDER BY id
-''')
-
-rows = cur.fetchall()
-mismatches = []
-
-for row in rows:
-    lemma_id, lemma, entry_num, lemma_type, greek_text, source_ids = row
-
-    if greek_text:
-        # Extract the headword from greek_text (before the middle dot)
-        first_colon = greek_text.find('·')
-        if first_colon > 0:
-            actual_headword = greek_text[:first_colon].strip()
-
-            # Check if lemma matches actual_headword
-            if lemma != actual_headword:
-                mismatches.append({
-                    'id': lemma_id,
-                    'entry_num': entry_num,
-                    'wrong_lemma': lemma,
-                    'correct_lemma': actual_headword,
-                    'greek_preview': greek_text[:200]
-                })
+''', (WHITESPACE,))
+
+mismatches = [
+    {
+        'id': lemma_id,
+        'entry_num': entry_num,
+        'wrong_lemma': lemma,
+        'correct_lemma': actual_headword,
+        'greek_preview': greek_preview
+    }
+    for lemma_id, entry_num, lemma, actual_headword, greek_preview in cur.fetchall()
+]
 
 print(f'Found {len(mismatches)} mismatched lemmas:\n')
 
@@ -4,6 +4,13 @@
 from db import get_connection
 import unicodedata
 
+# Accented characters by type, built once from the combining-diacritics,
+# Greek and Greek Extended blocks (the only ones with TONOS/OXIA names) so
+# the scan below is a set lookup per character instead of unicodedata.name()
+GREEK_CODE_POINTS = [chr(cp) for block in (range(0x0300, 0x0400), range(0x1F00, 0x2000)) for cp in block]
+TONOS_CHARS = frozenset(c for c in GREEK_CODE_POINTS if 'TONOS' in unicodedata.name(c, ''))
+OXIA_CHARS = frozenset(c for c in GREEK_CODE_POINTS if 'OXIA' in unicodedata.name(c, ''))
+
 conn = get_connection()
 cur = conn.cursor()
 
@@ -25,17 +32,14 @@ for lemma_id, lemma, greek_text in rows:
     text_to_check = lemma + (greek_text[:100] if greek_text else '')
 
     for char in text_to_check:
-        code = ord(char)
-        name = unicodedata.name(char, '')
-
-        if 'TONOS' in name:
+        if char in TONOS_CHARS:
             tonos_count += 1
             if tonos_count <= 5:  # Show first few examples
-                print(f"TONOS found: '{char}' U+{code:04X} {name}")
-        elif 'OXIA' in name:
+                print(f"TONOS found: '{char}' U+{ord(char):04X} {unicodedata.name(char)}")
+        elif char in OXIA_CHARS:
             oxia_count += 1
             if oxia_count <= 5:  # Show first few examples
-                print(f"OXIA found: '{char}' U+{code:04X} {name}")
+                print(f"OXIA found: '{char}' U+{ord(char):04X} {unicodedata.name(char)}")
 
 print(f"\nSummary:")
 print(f"  TONOS (modern Greek): {tonos_count}")
@@ -2,10 +2,34 @@
 """
 Quick check of Wikidata coverage for Stephanos headwords.
 Checks for place matches and coordinate data.
+
+Usage:
+    uv run check_wikidata_places.py                         # Check the built-in sample places
+    uv run check_wikidata_places.py --from-db --limit 200   # Check headwords not yet linked to Wikidata
+    uv run check_wikidata_places.py --refresh               # Query Wikidata again and update the cache
 """
-import requests
-import time
+import argparse
+import hashlib
 import json
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from db import get_connection
+from link_wikidata_places import extract_english_name
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Accepts the raw response bytes as well as str
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 # Sample headwords to check
 SAMPLE_PLACES = [
@@ -28,105 +52,292 @@ SAMPLE_PLACES = [
 
 WIKIDATA_ENDPOINT = "https://query.wikidata.org/sparql"
 
-def search_wikidata(name_greek, name_english):
-    """Search Wikidata for a place and check for coordinates."""
-
-    # Try English name first via search API
-    search_terms = [name_english]
-    if name_greek:
-        search_terms.append(name_greek)
-
-    for term in search_terms:
-        try:
-            # Use Wikidata search API
-            search_response = requests.get(
-                "https://www.wikidata.org/w/api.php",
-                params={
-                    "action": "wbsearchentities",
-                    "search": term,
-                    "language": "en",
-                    "limit": 5,
-                    "format": "json"
-                },
-                headers={"User-Agent": "StephanosProject/1.0"},
-                timeout=30
+# Search terms are sent to the query service in batches of BATCH_SIZE
+# (one SPARQL request each); batches run concurrently under one rate limit
+BATCH_SIZE = 50
+SEARCH_LIMIT = 5
+MAX_RESULTS_PER_TERM = 20
+MAX_WORKERS = 3
+REQUESTS_PER_SECOND = 5
+
+# Query responses are cached on disk so reruns don't hit Wikidata again
+CACHE_PATH = ".wikidata_cache.sqlite"
+CACHE_TTL_SECONDS = 7 * 86400
+
+# Retries for throttled (429) or failed (5xx) queries: exponential backoff
+# with full jitter, or the server's Retry-After when it sends one
+MAX_ATTEMPTS = 5
+BACKOFF_INITIAL_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Spaces requests at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of JSON responses, keyed by endpoint and query, with a TTL.
+
+    With refresh=True every lookup misses, so fresh responses overwrite the cache.
+    """
+
+    def __init__(self, path, ttl, refresh=False):
+        self.ttl = ttl
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
             )
-            search_response.raise_for_status()
-            search_data = search_response.json()
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(endpoint, query):
+        return hashlib.sha1(f"{endpoint}\n{query}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if self.refresh:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return _json_loads(row[0])
+
+    def set(self, key, data):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(data, ensure_ascii=False), time.time()),
+            )
+            self.conn.commit()
 
-            qids = [r["id"] for r in search_data.get("search", [])]
 
-            if not qids:
-                continue
+def make_session():
+    """HTTP session with a connection pool large enough for MAX_WORKERS."""
+    session = requests.Session()
+    session.headers["User-Agent"] = "StephanosProject/1.0"
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    return session
 
-            # Query SPARQL for details including coordinates
-            qid_values = " ".join(f"wd:{qid}" for qid in qids)
-            query = f"""
-            SELECT ?item ?itemLabel ?itemDescription ?coord ?placeType ?placeTypeLabel
-            WHERE {{
-                VALUES ?item {{ {qid_values} }}
 
-                # Check if it's a geographic entity
-                OPTIONAL {{
-                    ?item wdt:P625 ?coord .
-                }}
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying after a throttled or failed response."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX_SECONDS)
+    backoff = min(BACKOFF_MAX_SECONDS, BACKOFF_INITIAL_SECONDS * 2 ** attempt)
+    return random.uniform(0, backoff)
 
-                OPTIONAL {{
-                    ?item wdt:P31 ?placeType .
-                }}
 
-                SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en,grc,la". }}
-            }}
-            LIMIT 20
-            """
+def post_with_retry(session, rate_limiter, url, data):
+    """POST under the rate limit, retrying 429/5xx responses and connection errors."""
+    for attempt in range(MAX_ATTEMPTS):
+        rate_limiter.wait()
+        try:
+            response = session.post(url, data=data, timeout=60)
+        except requests.ConnectionError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(retry_delay(None, attempt))
+            continue
+        if response.status_code in RETRY_STATUS_CODES and attempt < MAX_ATTEMPTS - 1:
+            time.sleep(retry_delay(response, attempt))
+            continue
+        response.raise_for_status()
+        return response
+
+
+def sparql_string(value):
+    """Quote a Python string as a SPARQL string literal."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def search_wikidata_batch(session, rate_limiter, cache, terms):
+    """
+    Search Wikidata for several terms in one SPARQL query, checking for coordinates.
+
+    Entity search runs inside the query service (wikibase:mwapi EntitySearch),
+    so each term costs no extra HTTP request. Returns {term: [results]} with
+    each term's results in search-rank order; terms with no match are omitted.
+    """
+    term_values = " ".join(sparql_string(term) for term in terms)
+    query = f"""
+    SELECT ?term ?ordinal ?item ?itemLabel ?itemDescription ?coord ?placeType ?placeTypeLabel
+    WHERE {{
+        VALUES ?term {{ {term_values} }}
+
+        SERVICE wikibase:mwapi {{
+            bd:serviceParam wikibase:endpoint "www.wikidata.org";
+                            wikibase:api "EntitySearch";
+                            wikibase:limit {SEARCH_LIMIT};
+                            mwapi:search ?term;
+                            mwapi:language "en".
+            ?item wikibase:apiOutputItem mwapi:item.
+            ?ordinal wikibase:apiOrdinal true.
+        }}
+
+        # Check if it's a geographic entity
+        OPTIONAL {{
+            ?item wdt:P625 ?coord .
+        }}
+
+        OPTIONAL {{
+            ?item wdt:P31 ?placeType .
+        }}
+
+        SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en,grc,la". }}
+    }}
+    ORDER BY ?term ?ordinal
+    """
+
+    cache_key = cache.make_key(WIKIDATA_ENDPOINT, query)
+    data = cache.get(cache_key)
+    if data is None:
+        response = post_with_retry(
+            session, rate_limiter, WIKIDATA_ENDPOINT, {"query": query, "format": "json"}
+        )
+        data = _json_loads(response.content)
+        cache.set(cache_key, data)
+
+    results_by_term = {}
+    for result in data.get("results", {}).get("bindings", []):
+        term = result["term"]["value"]
+        results = results_by_term.setdefault(term, [])
+        if len(results) >= MAX_RESULTS_PER_TERM:
+            continue
 
-            response = requests.get(
-                WIKIDATA_ENDPOINT,
-                params={"query": query, "format": "json"},
-                headers={"User-Agent": "StephanosProject/1.0"},
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            results = []
-            for result in data.get("results", {}).get("bindings", []):
-                qid = result["item"]["value"].split("/")[-1]
-                label = result.get("itemLabel", {}).get("value", "")
-                description = result.get("itemDescription", {}).get("value", "")
-                coord = result.get("coord", {}).get("value", "")
-                place_type = result.get("placeTypeLabel", {}).get("value", "")
-
-                # Parse coordinates if present
-                lat, lon = None, None
-                if coord and coord.startswith("Point("):
-                    # Format: Point(lon lat)
-                    coords = coord.replace("Point(", "").replace(")", "").split()
-                    if len(coords) == 2:
-                        lon, lat = float(coords[0]), float(coords[1])
-
-                results.append({
-                    "qid": qid,
-                    "label": label,
-                    "description": description,
-                    "has_coords": lat is not None,
-                    "lat": lat,
-                    "lon": lon,
-                    "place_type": place_type,
-                })
-
-            if results:
-                return results
+        qid = result["item"]["value"].split("/")[-1]
+        label = result.get("itemLabel", {}).get("value", "")
+        description = result.get("itemDescription", {}).get("value", "")
+        coord = result.get("coord", {}).get("value", "")
+        place_type = result.get("placeTypeLabel", {}).get("value", "")
+
+        # Parse coordinates if present
+        lat, lon = None, None
+        if coord and coord.startswith("Point("):
+            # Format: Point(lon lat)
+            coords = coord.replace("Point(", "").replace(")", "").split()
+            if len(coords) == 2:
+                lon, lat = float(coords[0]), float(coords[1])
+
+        results.append({
+            "qid": qid,
+            "label": label,
+            "description": description,
+            "has_coords": lat is not None,
+            "lat": lat,
+            "lon": lon,
+            "place_type": place_type,
+        })
+
+    return results_by_term
 
-        except Exception as e:
-            print(f"  Error searching '{term}': {e}")
 
-        time.sleep(0.5)  # Rate limit
+def search_wikidata_terms(session, rate_limiter, cache, terms):
+    """Search all terms in batches of BATCH_SIZE, running batches concurrently."""
+    terms = list(dict.fromkeys(terms))
+    batches = [terms[i:i + BATCH_SIZE] for i in range(0, len(terms), BATCH_SIZE)]
 
-    return []
+    def run_batch(batch):
+        try:
+            return search_wikidata_batch(session, rate_limiter, cache, batch)
+        except Exception as e:
+            print(f"  Error searching {len(batch)} terms ({batch[0]}...): {e}")
+            return {}
+
+    results_by_term = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for batch_results in executor.map(run_batch, batches):
+            results_by_term.update(batch_results)
+    return results_by_term
+
+
+def search_wikidata_places(session, rate_limiter, cache, places):
+    """
+    Search Wikidata for (greek, english) places: English names first, then
+    Greek names for the places the English search missed.
+
+    Returns a list of result lists, in the same order as places.
+    """
+    english_results = search_wikidata_terms(
+        session, rate_limiter, cache, [english for _, english in places]
+    )
+    greek_terms = [
+        greek for greek, english in places
+        if greek and not english_results.get(english)
+    ]
+    greek_results = search_wikidata_terms(session, rate_limiter, cache, greek_terms) if greek_terms else {}
+
+    return [
+        english_results.get(english) or greek_results.get(greek) or []
+        for greek, english in places
+    ]
+
+
+def fetch_unlinked_places(limit):
+    """
+    (greek, english) pairs for headwords link_wikidata_places.py hasn't
+    processed yet, so repeated checks only look at new entries.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT lemma, MIN(greek_text)
+        FROM assembled_lemmas
+        WHERE lemma IS NOT NULL AND lemma != ''
+          AND wikidata_place_confidence IS NULL
+        GROUP BY lemma
+        ORDER BY MIN(id)
+        LIMIT %s
+        """,
+        (limit,)
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return [(lemma, extract_english_name(lemma, greek_text or "")) for lemma, greek_text in rows]
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Check Wikidata coverage for sample Stephanos headwords")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached Wikidata responses and query again")
+    parser.add_argument("--from-db", action="store_true",
+                        help="Check headwords from assembled_lemmas not yet linked to Wikidata, instead of the sample")
+    parser.add_argument("--limit", type=int, default=100,
+                        help="Maximum headwords to check with --from-db (default: 100)")
+    args = parser.parse_args()
+
+    places = fetch_unlinked_places(args.limit) if args.from_db else SAMPLE_PLACES
+    if not places:
+        print("No unlinked headwords to check.")
+        return
+
     print("Checking Wikidata coverage for Stephanos headwords...")
     print("=" * 70)
 
@@ -134,10 +345,14 @@ def main():
     geocoded_count = 0
     results_summary = []
 
-    for greek, english in SAMPLE_PLACES:
-        print(f"\n{greek} ({english}):")
+    # Look up all places in batched queries, then report in the original order
+    session = make_session()
+    rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+    cache = ResponseCache(CACHE_PATH, CACHE_TTL_SECONDS, refresh=args.refresh)
+    all_results = search_wikidata_places(session, rate_limiter, cache, places)
 
-        results = search_wikidata(greek, english)
+    for (greek, english), results in zip(places, all_results):
+        print(f"\n{greek} ({english}):")
 
         if not results:
             print("  No Wikidata matches found")
@@ -153,17 +368,17 @@ def main():
         has_geo = False
 
         for r in results[:3]:  # Show top 3
-            geo_str = ""
-            if r["has_coords"]:
-                geo_str = f" 📍 ({r['lat']:.4f}, {r['lon']:.4f})"
-                has_geo = True
+            description = r["description"]
+            if len(description) > 60:
+                description = f"{description[:60]}..."
 
-            print(f"  {r['qid']}: {r['label']}")
-            print(f"    {r['description'][:60]}..." if len(r.get('description', '')) > 60 else f"    {r.get('description', '')}")
+            lines = [f"  {r['qid']}: {r['label']}", f"    {description}"]
             if r["place_type"]:
-                print(f"    Type: {r['place_type']}")
-            if geo_str:
-                print(f"    Coordinates: {r['lat']:.4f}, {r['lon']:.4f}")
+                lines.append(f"    Type: {r['place_type']}")
+            if r["has_coords"]:
+                lines.append(f"    Coordinates: {r['lat']:.4f}, {r['lon']:.4f}")
+                has_geo = True
+            print("\n".join(lines))
 
         if has_geo:
             geocoded_count += 1
@@ -176,13 +391,11 @@ def main():
             "qid": results[0]["qid"] if results else None,
         })
 
-        time.sleep(1)  # Rate limit between places
-
     print("\n" + "=" * 70)
-    print(f"SUMMARY ({len(SAMPLE_PLACES)} places checked):")
-    print(f"  Found in Wikidata: {found_count} ({100*found_count/len(SAMPLE_PLACES):.0f}%)")
-    print(f"  With coordinates:  {geocoded_count} ({100*geocoded_count/len(SAMPLE_PLACES):.0f}%)")
-    print(f"  Not found:         {len(SAMPLE_PLACES) - found_count}")
+    print(f"SUMMARY ({len(places)} places checked):")
+    print(f"  Found in Wikidata: {found_count} ({100*found_count/len(places):.0f}%)")
+    print(f"  With coordinates:  {geocoded_count} ({100*geocoded_count/len(places):.0f}%)")
+    print(f"  Not found:         {len(places) - found_count}")
 
     print("\n\nDetailed results:")
     for r in results_summary:
@@ -5,9 +5,18 @@ Count words in Greek text for each assembled lemma.
 Only counts lemmas where word_count is NULL (hasn't been counted yet).
 Counts words in the greek_text field, excluding apparatus and notes.
 """
-import re
+import numpy as np
+from psycopg2.extras import execute_values
+
 from db import get_connection
 
+UPDATE_PAGE_SIZE = 1000
+
+# Greek letter ranges including polytonic characters
+# Basic Greek: \u0370-\u03FF
+# Greek Extended (polytonic): \u1F00-\u1FFF
+GREEK_RANGES = ((0x0370, 0x03FF), (0x1F00, 0x1FFF))
+
 
 def count_greek_words(text):
     """
@@ -19,13 +28,13 @@ def count_greek_words(text):
     if not text:
         return 0
 
-    # Greek letter ranges including polytonic characters
-    # Basic Greek: \u0370-\u03FF
-    # Greek Extended (polytonic): \u1F00-\u1FFF
-    greek_word_pattern = r'[\u0370-\u03FF\u1F00-\u1FFF]+'
-
-    words = re.findall(greek_word_pattern, text)
-    return len(words)
+    # Vectorised scan over the code points: a word starts wherever a Greek
+    # letter follows a non-Greek character (or opens the text)
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    greek = np.zeros(len(codepoints), dtype=bool)
+    for low, high in GREEK_RANGES:
+        greek |= (codepoints >= low) & (codepoints <= high)
+    return int(greek[0]) + int(np.count_nonzero(greek[1:] & ~greek[:-1]))
 
 
 def main():
@@ -49,7 +58,7 @@ def main():
 
     print(f"Counting words for {len(lemmas)} lemmas...")
 
-    updated = 0
+    counts = []
     for lemma_id, greek_text, human_greek_text in lemmas:
         # Use human-corrected text if available, otherwise OCR text
         text = human_greek_text if human_greek_text else greek_text
@@ -60,16 +69,21 @@ def main():
         else:
             word_count = count_greek_words(text)
 
-        cur.execute("""
-            UPDATE assembled_lemmas
-            SET word_count = %s
-            WHERE id = %s
-        """, (word_count, lemma_id))
-
-        updated += 1
-        if updated % 100 == 0:
-            print(f"  Processed {updated}/{len(lemmas)}...")
-            conn.commit()
+        counts.append((lemma_id, word_count))
+
+    # One UPDATE ... FROM (VALUES ...) per page instead of one UPDATE per lemma
+    execute_values(
+        cur,
+        """
+        UPDATE assembled_lemmas AS a
+        SET word_count = v.word_count
+        FROM (VALUES %s) AS v(id, word_count)
+        WHERE a.id = v.id
+        """,
+        counts,
+        page_size=UPDATE_PAGE_SIZE,
+    )
+    updated = len(counts)
 
     conn.commit()
     conn.close()
@@ -6,7 +6,6 @@ Creates a CSV file with all extracted etymologies, including:
 - Lemma information (headword, entry number)
 - Etymology details (Greek text, English translation, category)
 """
-import csv
 from pathlib import Path
 from db import get_connection
 
@@ -20,48 +19,37 @@ def main():
     conn = get_connection()
     cur = conn.cursor()
 
-    # Get all etymologies with their lemma context
+    # Get all etymologies with their lemma context; Postgres writes the CSV
+    # and it streams straight into the file
+    with open(OUTPUT_FILE, 'wb') as f:
+        cur.copy_expert("""
+            COPY (
+                SELECT
+                    l.lemma AS "Lemma Headword",
+                    l.entry_number AS "Entry Number",
+                    l.version AS "Version",
+                    e.greek_text AS "Greek Text",
+                    e.english_translation AS "English Translation",
+                    e.category AS "Category",
+                    e.created_at AS "Extracted At"
+                FROM etymologies e
+                JOIN assembled_lemmas l ON e.lemma_id = l.id
+                ORDER BY l.lemma, l.entry_number, e.category
+            ) TO STDOUT WITH (FORMAT csv, HEADER)
+        """, f)
+
+    # Count by category
     cur.execute("""
-        SELECT
-            l.lemma as lemma_headword,
-            l.entry_number,
-            l.version,
-            e.greek_text,
-            e.english_translation,
-            e.category,
-            e.created_at
+        SELECT e.category, COUNT(*)
         FROM etymologies e
         JOIN assembled_lemmas l ON e.lemma_id = l.id
-        ORDER BY l.lemma, l.entry_number, e.category
+        GROUP BY e.category
     """)
-
-    rows = cur.fetchall()
-
-    # Write CSV
-    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            'Lemma Headword',
-            'Entry Number',
-            'Version',
-            'Greek Text',
-            'English Translation',
-            'Category',
-            'Extracted At'
-        ])
-
-        for row in rows:
-            writer.writerow(row)
+    categories = dict(cur.fetchall())
 
     conn.close()
 
-    # Count by category
-    categories = {}
-    for row in rows:
-        cat = row[5]
-        categories[cat] = categories.get(cat, 0) + 1
-
-    print(f"Exported {len(rows)} etymologies to {OUTPUT_FILE}")
+    print(f"Exported {sum(categories.values())} etymologies to {OUTPUT_FILE}")
     for cat, count in sorted(categories.items()):
         print(f"  {cat}: {count}")
 
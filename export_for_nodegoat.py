@@ -10,12 +10,39 @@ import csv
 import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from collections import defaultdict
+from functools import lru_cache
+from types import MappingProxyType
 
 import db
 
+# Each export reads through a server-side (named) cursor, fetching this many
+# rows per round trip instead of materializing the whole result
+EXPORT_ITERSIZE = 5000
 
+# CSV files are written through a 1 MiB buffer (rows of Greek text are large)
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# COPY ... (FORMAT csv) always ends rows with \n, so every CSV in the export
+# uses it too rather than the csv module's default \r\n
+CSV_LINE_TERMINATOR = '\n'
+
+# Citation patterns, tried in this order by parse_citation(). Each is only
+# searched once a cheap substring/character test shows it could match.
+_FGRHIST_RE = re.compile(r'FGrHist\s+(\d+)\s+F\s+(\d+\w?)')
+_FHG_RE = re.compile(r'FHG\s+([IVX]+)\s+(\d+\w?)')
+_FRAGMENT_RE = re.compile(r'fr\.?\s*(\d+\w?)\s+(\w+)')
+_HOMER_BOOKS = 'ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩαβγδεζηθικλμνξοπρστυφχψω'
+_HOMER_BOOK_CHARS = frozenset(_HOMER_BOOKS)
+_HOMER_RE = re.compile(r'\(([' + _HOMER_BOOKS + r'])\s+(\d+)')
+_PASSAGE_RE = re.compile(r'(\d+)[,.](\d+)[,.](\d+)')
+_CASAUBON_RE = re.compile(r'\[C\s*(\d+)[,.](\d+)\]')
+_PCG_RE = re.compile(r'PCG\s+([IVX]+)\s+(\d+)')
+_SIMPLE_RE = re.compile(r'^(\d+)$')
+
+
+@lru_cache(maxsize=16384)
 def normalize_name(name):
     """Remove diacritics and normalize Greek name for matching."""
     if not name:
@@ -26,45 +53,71 @@ def normalize_name(name):
     return unicodedata.normalize('NFC', without_diacritics).lower()
 
 
+# Greek to Latin mapping (simplified)
+_GREEK_TO_LATIN = {
+    'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z',
+    'η': 'ē', 'θ': 'th', 'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm',
+    'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p', 'ρ': 'r', 'σ': 's',
+    'ς': 's', 'τ': 't', 'υ': 'u', 'φ': 'ph', 'χ': 'ch', 'ψ': 'ps',
+    'ω': 'ō', 'ἀ': 'a', 'ἁ': 'ha', 'ἐ': 'e', 'ἑ': 'he', 'ἠ': 'ē',
+    'ἡ': 'hē', 'ἰ': 'i', 'ἱ': 'hi', 'ὀ': 'o', 'ὁ': 'ho', 'ὐ': 'u',
+    'ὑ': 'hu', 'ὠ': 'ō', 'ὡ': 'hō',
+    'Α': 'A', 'Β': 'B', 'Γ': 'G', 'Δ': 'D', 'Ε': 'E', 'Ζ': 'Z',
+    'Η': 'Ē', 'Θ': 'Th', 'Ι': 'I', 'Κ': 'K', 'Λ': 'L', 'Μ': 'M',
+    'Ν': 'N', 'Ξ': 'X', 'Ο': 'O', 'Π': 'P', 'Ρ': 'R', 'Σ': 'S',
+    'Τ': 'T', 'Υ': 'U', 'Φ': 'Ph', 'Χ': 'Ch', 'Ψ': 'Ps', 'Ω': 'Ō',
+    'Ἀ': 'A', 'Ἁ': 'Ha', 'Ἐ': 'E', 'Ἑ': 'He', 'Ἠ': 'Ē', 'Ἡ': 'Hē',
+    'Ἰ': 'I', 'Ἱ': 'Hi', 'Ὀ': 'O', 'Ὁ': 'Ho', 'Ὑ': 'Hu', 'Ὠ': 'Ō',
+    'Ὡ': 'Hō',
+}
+
+
+class _TransliterationTable(dict):
+    """
+    str.translate() table for NFD text: drops combining diacritics and maps
+    Greek letters to Latin. Entries are filled in the first time a code point
+    is seen, so the table never has to enumerate all of Unicode.
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        if unicodedata.combining(char):
+            value = None  # Skip combining diacritics
+        else:
+            base_char = unicodedata.normalize('NFC', char)
+            value = _GREEK_TO_LATIN.get(base_char, base_char)
+        self[codepoint] = value
+        return value
+
+
+_TRANSLITERATION_TABLE = _TransliterationTable()
+
+
+@lru_cache(maxsize=32768)
 def transliterate_greek(text):
-    """Basic Greek to Latin transliteration."""
+    """Basic Greek to Latin transliteration (memoized; names recur across exports)."""
     if not text:
         return ""
 
-    # Greek to Latin mapping (simplified)
-    trans_map = {
-        'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z',
-        'η': 'ē', 'θ': 'th', 'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm',
-        'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p', 'ρ': 'r', 'σ': 's',
-        'ς': 's', 'τ': 't', 'υ': 'u', 'φ': 'ph', 'χ': 'ch', 'ψ': 'ps',
-        'ω': 'ō', 'ἀ': 'a', 'ἁ': 'ha', 'ἐ': 'e', 'ἑ': 'he', 'ἠ': 'ē',
-        'ἡ': 'hē', 'ἰ': 'i', 'ἱ': 'hi', 'ὀ': 'o', 'ὁ': 'ho', 'ὐ': 'u',
-        'ὑ': 'hu', 'ὠ': 'ō', 'ὡ': 'hō',
-        'Α': 'A', 'Β': 'B', 'Γ': 'G', 'Δ': 'D', 'Ε': 'E', 'Ζ': 'Z',
-        'Η': 'Ē', 'Θ': 'Th', 'Ι': 'I', 'Κ': 'K', 'Λ': 'L', 'Μ': 'M',
-        'Ν': 'N', 'Ξ': 'X', 'Ο': 'O', 'Π': 'P', 'Ρ': 'R', 'Σ': 'S',
-        'Τ': 'T', 'Υ': 'U', 'Φ': 'Ph', 'Χ': 'Ch', 'Ψ': 'Ps', 'Ω': 'Ō',
-        'Ἀ': 'A', 'Ἁ': 'Ha', 'Ἐ': 'E', 'Ἑ': 'He', 'Ἠ': 'Ē', 'Ἡ': 'Hē',
-        'Ἰ': 'I', 'Ἱ': 'Hi', 'Ὀ': 'O', 'Ὁ': 'Ho', 'Ὑ': 'Hu', 'Ὠ': 'Ō',
-        'Ὡ': 'Hō',
-    }
-
-    # First normalize to remove additional diacritics
-    text = unicodedata.normalize('NFD', text)
-    result = []
-    for char in text:
-        if unicodedata.combining(char):
-            continue  # Skip combining diacritics
-        base_char = unicodedata.normalize('NFC', char)
-        result.append(trans_map.get(base_char, base_char))
-
-    return ''.join(result)
+    # Decompose so diacritics become separate (droppable) code points
+    return unicodedata.normalize('NFD', text).translate(_TRANSLITERATION_TABLE)
 
 
+@lru_cache(maxsize=65536)
 def parse_citation(citation_str):
     """
     Parse citation string into structured components.
 
+    Results are memoized per string (the same citations recur across works and
+    entries), so the returned mapping is read-only.
+    """
+    return MappingProxyType(_parse_citation(citation_str))
+
+
+def _parse_citation(citation_str):
+    """
+    Uncached parser behind parse_citation().
+
     Returns dict with:
         - citation_type: 'fgrhist', 'fragment', 'passage', 'homeric', etc.
         - author_num: For FGrHist, the author number
@@ -79,7 +132,7 @@ def parse_citation(citation_str):
     result = {'raw': citation_str}
 
     # FGrHist pattern: "FGrHist 1 F 108" or "FGrHist 115 F 17"
-    fgrhist_match = re.search(r'FGrHist\s+(\d+)\s+F\s+(\d+\w?)', citation_str)
+    fgrhist_match = 'FGrHist' in citation_str and _FGRHIST_RE.search(citation_str)
     if fgrhist_match:
         result['citation_type'] = 'fgrhist'
         result['author_num'] = fgrhist_match.group(1)
@@ -87,7 +140,7 @@ def parse_citation(citation_str):
         return result
 
     # FHG pattern: "FHG II 464a"
-    fhg_match = re.search(r'FHG\s+([IVX]+)\s+(\d+\w?)', citation_str)
+    fhg_match = 'FHG' in citation_str and _FHG_RE.search(citation_str)
     if fhg_match:
         result['citation_type'] = 'fhg'
         result['volume'] = fhg_match.group(1)
@@ -95,7 +148,7 @@ def parse_citation(citation_str):
         return result
 
     # Fragment pattern: "fr. 12 Matthews" or "fr. 115 Sandbach"
-    frag_match = re.search(r'fr\.?\s*(\d+\w?)\s+(\w+)', citation_str)
+    frag_match = _FRAGMENT_RE.search(citation_str)
     if frag_match:
         result['citation_type'] = 'fragment'
         result['fragment_num'] = frag_match.group(1)
@@ -103,7 +156,12 @@ def parse_citation(citation_str):
         return result
 
     # Homeric pattern: "(Β 594)" or "(ι 39)"
-    homer_match = re.search(r'\(([ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩαβγδεζηθικλμνξοπρστυφχψω])\s+(\d+)', citation_str)
+    # Most citations contain no Greek letter at all
+    homer_match = (
+        '(' in citation_str
+        and not _HOMER_BOOK_CHARS.isdisjoint(citation_str)
+        and _HOMER_RE.search(citation_str)
+    )
     if homer_match:
         result['citation_type'] = 'homeric'
         result['book'] = homer_match.group(1)
@@ -111,21 +169,21 @@ def parse_citation(citation_str):
         return result
 
     # Strabo-style: "8,6,22 [C 380,20]" or "(7,42,1)"
-    strabo_match = re.search(r'(\d+)[,.](\d+)[,.](\d+)', citation_str)
+    strabo_match = _PASSAGE_RE.search(citation_str)
     if strabo_match:
         result['citation_type'] = 'passage'
         result['book'] = strabo_match.group(1)
         result['chapter'] = strabo_match.group(2)
         result['section'] = strabo_match.group(3)
         # Check for Casaubon page
-        casaubon = re.search(r'\[C\s*(\d+)[,.](\d+)\]', citation_str)
+        casaubon = _CASAUBON_RE.search(citation_str)
         if casaubon:
             result['casaubon_page'] = casaubon.group(1)
             result['casaubon_line'] = casaubon.group(2)
         return result
 
     # PCG pattern: "PCG IV 124"
-    pcg_match = re.search(r'PCG\s+([IVX]+)\s+(\d+)', citation_str)
+    pcg_match = 'PCG' in citation_str and _PCG_RE.search(citation_str)
     if pcg_match:
         result['citation_type'] = 'pcg'
         result['volume'] = pcg_match.group(1)
@@ -133,7 +191,7 @@ def parse_citation(citation_str):
         return result
 
     # Simple number (could be line number, etc.)
-    simple_match = re.match(r'^(\d+)$', citation_str.strip())
+    simple_match = _SIMPLE_RE.match(citation_str.strip())
     if simple_match:
         result['citation_type'] = 'simple'
         result['number'] = simple_match.group(1)
@@ -144,9 +202,42 @@ def parse_citation(citation_str):
     return result
 
 
+def create_export_proper_nouns(conn):
+    """
+    Materialize proper_nouns joined to their source lemma as a temp table.
+
+    The entities, authors, works, mentions and citations exports all read
+    proper_nouns; building the join once saves re-scanning and re-joining
+    assembled_lemmas for each. The table lives until the connection closes.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE export_proper_nouns AS
+        SELECT
+            pn.id,
+            pn.lemma_id,
+            pn.proper_noun,
+            pn.noun_type,
+            pn.role,
+            pn.lemma_form,
+            pn.english_translation,
+            pn.wikidata_qid,
+            pn.work_title,
+            pn.citation,
+            al.billerbeck_id,
+            al.lemma AS source_lemma
+        FROM proper_nouns pn
+        JOIN assembled_lemmas al ON pn.lemma_id = al.id
+    """)
+    cur.execute("CREATE INDEX ON export_proper_nouns (role)")
+    cur.execute("ANALYZE export_proper_nouns")
+    cur.close()
+
+
 def export_entries(conn, output_dir):
     """Export assembled_lemmas to entries.csv"""
-    cur = conn.cursor()
+    cur = conn.cursor(name='export_entries')
+    cur.itersize = EXPORT_ITERSIZE
 
     cur.execute("""
         SELECT
@@ -160,8 +251,8 @@ def export_entries(conn, output_dir):
     """)
 
     output_path = os.path.join(output_dir, 'entries.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
         writer.writerow([
             'id', 'headword', 'headword_latin', 'entry_number', 'billerbeck_id',
             'meineke_id', 'type', 'version', 'volume_label',
@@ -169,8 +260,8 @@ def export_entries(conn, output_dir):
         ])
 
         count = 0
-        for row in cur.fetchall():
-            writer.writerow([
+        while rows := cur.fetchmany(EXPORT_ITERSIZE):
+            writer.writerows([
                 row[0],  # id
                 row[1],  # headword
                 transliterate_greek(row[1]),  # headword_latin
@@ -184,8 +275,10 @@ def export_entries(conn, output_dir):
                 row[9],  # translation
                 row[10], # word_count
                 row[11], # confidence
-            ])
-            count += 1
+            ] for row in rows)
+            count += len(rows)
+
+    cur.close()
 
     print(f"  Exported {count} entries to entries.csv")
     return count
@@ -198,46 +291,35 @@ def export_entities(conn, output_dir):
     Deduplication key: (proper_noun, noun_type, source_billerbeck_id)
     Using Billerbeck ID ensures entities from different entries stay distinct.
     """
-    cur = conn.cursor()
+    cur = conn.cursor(name='export_entities')
+    cur.itersize = EXPORT_ITERSIZE
 
-    # Get all proper nouns with their source entry's billerbeck_id
+    # Group proper nouns in SQL; within an entity, per-mention fields come
+    # from its lowest proper_noun id. COLLATE "C" keeps the code point order
+    # the export has always used.
     cur.execute("""
         SELECT
-            pn.id as pn_id,
             pn.proper_noun,
             pn.noun_type,
-            pn.role,
-            pn.lemma_id,
-            pn.wikidata_qid,
-            pn.english_translation,
-            al.billerbeck_id,
-            al.lemma as source_lemma
-        FROM proper_nouns pn
-        JOIN assembled_lemmas al ON pn.lemma_id = al.id
+            (ARRAY_AGG(pn.wikidata_qid ORDER BY pn.id)
+                FILTER (WHERE pn.wikidata_qid IS NOT NULL AND pn.wikidata_qid != ''))[1] AS wikidata_qid,
+            (ARRAY_AGG(pn.english_translation ORDER BY pn.id))[1] AS english,
+            (ARRAY_AGG(pn.billerbeck_id ORDER BY pn.id))[1] AS billerbeck_id,
+            (ARRAY_AGG(pn.source_lemma ORDER BY pn.id))[1] AS source_lemma,
+            (ARRAY_AGG(pn.lemma_id ORDER BY pn.id))[1] AS lemma_id,
+            COUNT(*) AS mention_count,
+            STRING_AGG(pn.id::text, '|' ORDER BY pn.id) AS pn_ids
+        FROM export_proper_nouns pn
         WHERE pn.role = 'entity'  -- Exclude sources (authors) for now
-        ORDER BY pn.noun_type, pn.proper_noun
+        GROUP BY pn.proper_noun, pn.noun_type,
+                 COALESCE(NULLIF(pn.billerbeck_id, ''), 'lemma_' || pn.lemma_id)
+        ORDER BY pn.proper_noun COLLATE "C", pn.noun_type COLLATE "C",
+                 COALESCE(NULLIF(pn.billerbeck_id, ''), 'lemma_' || pn.lemma_id) COLLATE "C"
     """)
 
-    # Group by (proper_noun, noun_type, billerbeck_id) for deduplication
-    entity_groups = defaultdict(list)
-    for row in cur.fetchall():
-        pn_id, proper_noun, noun_type, role, lemma_id, wikidata, english, billerbeck_id, source_lemma = row
-        # Key includes billerbeck_id to keep entries distinct
-        key = (proper_noun, noun_type, billerbeck_id or f"lemma_{lemma_id}")
-        entity_groups[key].append({
-            'pn_id': pn_id,
-            'proper_noun': proper_noun,
-            'noun_type': noun_type,
-            'lemma_id': lemma_id,
-            'wikidata_qid': wikidata,
-            'english': english,
-            'billerbeck_id': billerbeck_id,
-            'source_lemma': source_lemma,
-        })
-
     output_path = os.path.join(output_dir, 'entities.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
         writer.writerow([
             'entity_id', 'name', 'name_latin', 'name_normalized',
             'entity_type', 'wikidata_qid', 'english_name',
@@ -246,136 +328,111 @@ def export_entities(conn, output_dir):
         ])
 
         entity_id = 0
-        for key, mentions in sorted(entity_groups.items()):
+        for row in cur:
+            proper_noun, noun_type, wikidata, english, billerbeck_id, source_lemma, lemma_id, mention_count, pn_ids = row
             entity_id += 1
-            first = mentions[0]
-
-            # Collect all wikidata QIDs (take first non-null)
-            wikidata = next((m['wikidata_qid'] for m in mentions if m['wikidata_qid']), None)
-
-            # Collect all proper_noun IDs for this entity
-            pn_ids = [str(m['pn_id']) for m in mentions]
-
             writer.writerow([
                 entity_id,
-                first['proper_noun'],
-                transliterate_greek(first['proper_noun']),
-                normalize_name(first['proper_noun']),
-                first['noun_type'],
+                proper_noun,
+                transliterate_greek(proper_noun),
+                normalize_name(proper_noun),
+                noun_type,
                 wikidata,
-                first['english'],
-                first['billerbeck_id'],
-                first['source_lemma'],
-                first['lemma_id'],
-                len(mentions),
-                '|'.join(pn_ids),
+                english,
+                billerbeck_id,
+                source_lemma,
+                lemma_id,
+                mention_count,
+                pn_ids,
             ])
 
+    cur.close()
+
     print(f"  Exported {entity_id} unique entities to entities.csv")
     return entity_id
 
 
 def export_authors(conn, output_dir):
     """Export ancient authors (sources) to authors.csv"""
-    cur = conn.cursor()
+    cur = conn.cursor(name='export_authors')
+    cur.itersize = EXPORT_ITERSIZE
 
-    # Get all source citations
+    # One row per author, aggregated in SQL
     cur.execute("""
         SELECT
             pn.proper_noun,
-            pn.citation,
-            pn.work_title,
-            pn.wikidata_qid,
-            pn.lemma_id,
-            al.billerbeck_id,
-            COUNT(*) as citation_count
-        FROM proper_nouns pn
-        JOIN assembled_lemmas al ON pn.lemma_id = al.id
+            (ARRAY_AGG(pn.wikidata_qid ORDER BY pn.id)
+                FILTER (WHERE pn.wikidata_qid IS NOT NULL AND pn.wikidata_qid != ''))[1] AS wikidata_qid,
+            COUNT(*) AS citation_count,
+            COUNT(DISTINCT pn.work_title) FILTER (WHERE pn.work_title != '') AS work_count,
+            COALESCE(
+                STRING_AGG(DISTINCT pn.work_title COLLATE "C", '|' ORDER BY pn.work_title COLLATE "C")
+                    FILTER (WHERE pn.work_title != ''),
+                ''
+            ) AS works
+        FROM export_proper_nouns pn
         WHERE pn.role = 'source'
-        GROUP BY pn.proper_noun, pn.citation, pn.work_title, pn.wikidata_qid,
-                 pn.lemma_id, al.billerbeck_id
-        ORDER BY pn.proper_noun
+        GROUP BY pn.proper_noun
+        ORDER BY pn.proper_noun COLLATE "C"
     """)
 
-    # Group by author name to get unique authors
-    authors = defaultdict(lambda: {
-        'citations': [],
-        'wikidata': None,
-        'works': set(),
-    })
-
-    for row in cur.fetchall():
-        author_name, citation, work_title, wikidata, lemma_id, billerbeck_id, count = row
-        authors[author_name]['citations'].append({
-            'citation': citation,
-            'work_title': work_title,
-            'lemma_id': lemma_id,
-            'billerbeck_id': billerbeck_id,
-            'count': count,
-        })
-        if wikidata:
-            authors[author_name]['wikidata'] = wikidata
-        if work_title:
-            authors[author_name]['works'].add(work_title)
-
     output_path = os.path.join(output_dir, 'authors.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
         writer.writerow([
             'author_id', 'name', 'name_latin', 'wikidata_qid',
             'citation_count', 'work_count', 'works'
         ])
 
         author_id = 0
-        for name, data in sorted(authors.items()):
+        for name, wikidata, total_citations, work_count, works_list in cur:
             author_id += 1
-            total_citations = sum(c['count'] for c in data['citations'])
-            works_list = '|'.join(sorted(data['works']))
-
             writer.writerow([
                 author_id,
                 name,
                 transliterate_greek(name),
-                data['wikidata'],
+                wikidata,
                 total_citations,
-                len(data['works']),
+                work_count,
                 works_list,
             ])
 
+    cur.close()
+
     print(f"  Exported {author_id} unique authors to authors.csv")
-    return author_id, authors
+    return author_id
 
 
-def export_works(conn, output_dir, authors_data):
+def export_works(conn, output_dir):
     """Export cited works to works.csv"""
-    cur = conn.cursor()
+    cur = conn.cursor(name='export_works')
+    cur.itersize = EXPORT_ITERSIZE
 
-    # Get all unique work citations
+    # Distinct citations grouped by author + title in SQL; citation strings
+    # are still classified here by parse_citation()
     cur.execute("""
-        SELECT DISTINCT
-            pn.proper_noun as author,
-            pn.work_title,
-            pn.citation
-        FROM proper_nouns pn
-        WHERE pn.role = 'source'
-        AND (pn.work_title IS NOT NULL OR pn.citation IS NOT NULL)
-        ORDER BY pn.proper_noun, pn.work_title
+        SELECT
+            author,
+            title,
+            COUNT(*) AS citation_count,
+            ARRAY_AGG(citation ORDER BY citation COLLATE "C") AS citations
+        FROM (
+            SELECT DISTINCT
+                pn.proper_noun as author,
+                COALESCE(NULLIF(pn.work_title, ''), 'Unknown') AS title,
+                pn.work_title,
+                pn.citation
+            FROM export_proper_nouns pn
+            WHERE pn.role = 'source'
+            AND (pn.work_title IS NOT NULL OR pn.citation IS NOT NULL)
+        ) w
+        GROUP BY author, title
+        ORDER BY author COLLATE "C", title COLLATE "C"
     """)
 
-    # Group works by author + title
-    works = defaultdict(lambda: {'citations': [], 'parsed_citations': []})
-
-    for row in cur.fetchall():
-        author, work_title, citation = row
-        key = (author, work_title or 'Unknown')
-        works[key]['citations'].append(citation)
-        if citation:
-            parsed = parse_citation(citation)
-            works[key]['parsed_citations'].append(parsed)
-
     output_path = os.path.join(output_dir, 'works.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
         writer.writerow([
             'work_id', 'author', 'author_latin', 'title', 'title_latin',
             'citation_count', 'citation_types', 'fgrhist_author_num',
@@ -383,20 +440,23 @@ def export_works(conn, output_dir, authors_data):
         ])
 
         work_id = 0
-        for (author, title), data in sorted(works.items()):
+        for author, title, citation_count, citations in cur:
             work_id += 1
 
             # Analyze citation types
             citation_types = set()
             fgrhist_nums = set()
-            for parsed in data['parsed_citations']:
+            for citation in citations:
+                if not citation:
+                    continue
+                parsed = parse_citation(citation)
                 if parsed.get('citation_type'):
                     citation_types.add(parsed['citation_type'])
                 if parsed.get('author_num'):
                     fgrhist_nums.add(parsed['author_num'])
 
             # Sample citations (first 3)
-            sample = '|'.join(c for c in data['citations'][:3] if c)
+            sample = '|'.join(c for c in citations[:3] if c)
 
             writer.writerow([
                 work_id,
@@ -404,48 +464,59 @@ def export_works(conn, output_dir, authors_data):
                 transliterate_greek(author),
                 title,
                 transliterate_greek(title) if title else '',
-                len(data['citations']),
+                citation_count,
                 ','.join(sorted(citation_types)),
                 ','.join(sorted(fgrhist_nums)) if fgrhist_nums else '',
                 sample,
             ])
 
+    cur.close()
+
     print(f"  Exported {work_id} works to works.csv")
     return work_id
 
 
-def export_entry_entity_mentions(conn, output_dir):
-    """Export entry-entity relationships to entry_entity_mentions.csv"""
+def copy_query_to_csv(conn, query, output_path, header):
+    """
+    Write a CSV header row, then the rows of query via COPY ... TO STDOUT,
+    so Postgres formats the CSV. Returns the number of rows written.
+
+    For exports whose rows go out exactly as selected.
+    """
     cur = conn.cursor()
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        csv.writer(f, lineterminator=CSV_LINE_TERMINATOR).writerow(header)
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", f)
+    # Taken from the COPY command tag, so it counts exactly the rows written
+    count = cur.rowcount
+    cur.close()
+    return count
 
-    cur.execute("""
+
+def export_entry_entity_mentions(conn, output_dir):
+    """Export entry-entity relationships to entry_entity_mentions.csv"""
+    count = copy_query_to_csv(
+        conn,
+        """
         SELECT
             pn.id,
             pn.lemma_id,
-            al.billerbeck_id,
+            pn.billerbeck_id,
             pn.proper_noun,
             pn.noun_type,
             pn.role,
             pn.lemma_form,
             pn.english_translation
-        FROM proper_nouns pn
-        JOIN assembled_lemmas al ON pn.lemma_id = al.id
+        FROM export_proper_nouns pn
         WHERE pn.role = 'entity'
-        ORDER BY al.billerbeck_id, pn.proper_noun
-    """)
-
-    output_path = os.path.join(output_dir, 'entry_entity_mentions.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ORDER BY pn.billerbeck_id, pn.proper_noun
+        """,
+        os.path.join(output_dir, 'entry_entity_mentions.csv'),
+        [
             'proper_noun_id', 'entry_id', 'billerbeck_id',
             'entity_name', 'entity_type', 'lemma_form', 'english'
-        ])
-
-        count = 0
-        for row in cur.fetchall():
-            writer.writerow(row)
-            count += 1
+        ],
+    )
 
     print(f"  Exported {count} entity mentions to entry_entity_mentions.csv")
     return count
@@ -453,25 +524,25 @@ def export_entry_entity_mentions(conn, output_dir):
 
 def export_entry_citations(conn, output_dir):
     """Export author/work citations to entry_citations.csv"""
-    cur = conn.cursor()
+    cur = conn.cursor(name='export_entry_citations')
+    cur.itersize = EXPORT_ITERSIZE
 
     cur.execute("""
         SELECT
             pn.id,
             pn.lemma_id,
-            al.billerbeck_id,
+            pn.billerbeck_id,
             pn.proper_noun as author,
             pn.work_title,
             pn.citation
-        FROM proper_nouns pn
-        JOIN assembled_lemmas al ON pn.lemma_id = al.id
+        FROM export_proper_nouns pn
         WHERE pn.role = 'source'
-        ORDER BY al.billerbeck_id, pn.proper_noun
+        ORDER BY pn.billerbeck_id, pn.proper_noun
     """)
 
     output_path = os.path.join(output_dir, 'entry_citations.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
         writer.writerow([
             'proper_noun_id', 'entry_id', 'billerbeck_id',
             'author', 'author_latin', 'work_title', 'citation_raw',
@@ -479,12 +550,11 @@ def export_entry_citations(conn, output_dir):
             'book', 'passage'
         ])
 
-        count = 0
-        for row in cur.fetchall():
+        def citation_row(row):
             pn_id, lemma_id, billerbeck_id, author, work_title, citation = row
             parsed = parse_citation(citation)
 
-            writer.writerow([
+            return [
                 pn_id,
                 lemma_id,
                 billerbeck_id,
@@ -497,8 +567,14 @@ def export_entry_citations(conn, output_dir):
                 parsed.get('fragment_num'),
                 parsed.get('book'),
                 parsed.get('passage') or parsed.get('section'),
-            ])
-            count += 1
+            ]
+
+        count = 0
+        while rows := cur.fetchmany(EXPORT_ITERSIZE):
+            writer.writerows(map(citation_row, rows))
+            count += len(rows)
+
+    cur.close()
 
     print(f"  Exported {count} citations to entry_citations.csv")
     return count
@@ -506,7 +582,8 @@ def export_entry_citations(conn, output_dir):
 
 def export_aliases(conn, output_dir):
     """Export all aliases to aliases.csv"""
-    cur = conn.cursor()
+    cur = conn.cursor(name='export_aliases')
+    cur.itersize = EXPORT_ITERSIZE
 
     cur.execute("""
         SELECT
@@ -527,8 +604,8 @@ def export_aliases(conn, output_dir):
     """)
 
     output_path = os.path.join(output_dir, 'aliases.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator=CSV_LINE_TERMINATOR)
         writer.writerow([
             'alias_id', 'proper_noun_id', 'alias', 'alias_latin',
             'alias_type', 'source_pattern', 'source_lemma_id',
@@ -536,22 +613,14 @@ def export_aliases(conn, output_dir):
         ])
 
         count = 0
-        for row in cur.fetchall():
-            alias_id, pn_id, alias, alias_type, pattern, source_lemma_id, rule, entity_name, entity_type, billerbeck_id = row
-            writer.writerow([
-                alias_id,
-                pn_id,
-                alias,
-                transliterate_greek(alias),
-                alias_type,
-                pattern,
-                source_lemma_id,
-                rule,
-                entity_name,
-                entity_type,
-                billerbeck_id,
-            ])
-            count += 1
+        while rows := cur.fetchmany(EXPORT_ITERSIZE):
+            # alias_latin goes after alias (column 2)
+            writer.writerows(
+                (*row[:3], transliterate_greek(row[2]), *row[3:]) for row in rows
+            )
+            count += len(rows)
+
+    cur.close()
 
     print(f"  Exported {count} aliases to aliases.csv")
     return count
@@ -559,9 +628,9 @@ def export_aliases(conn, output_dir):
 
 def export_etymologies(conn, output_dir):
     """Export etymology data to etymologies.csv"""
-    cur = conn.cursor()
-
-    cur.execute("""
+    count = copy_query_to_csv(
+        conn,
+        """
         SELECT
             e.id,
             e.lemma_id,
@@ -573,25 +642,57 @@ def export_etymologies(conn, output_dir):
         FROM etymologies e
         JOIN assembled_lemmas al ON e.lemma_id = al.id
         ORDER BY al.billerbeck_id, e.id
-    """)
-
-    output_path = os.path.join(output_dir, 'etymologies.csv')
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        """,
+        os.path.join(output_dir, 'etymologies.csv'),
+        [
             'etymology_id', 'entry_id', 'billerbeck_id', 'headword',
             'category', 'greek_text', 'english_translation'
-        ])
-
-        count = 0
-        for row in cur.fetchall():
-            writer.writerow(row)
-            count += 1
+        ],
+    )
 
     print(f"  Exported {count} etymologies to etymologies.csv")
     return count
 
 
+# Exports grouped by the connection they run on; groups run in parallel
+# worker processes. The proper-noun exports share one connection so they can
+# share the export_proper_nouns temp table.
+EXPORT_GROUPS = [
+    (None, [
+        ('entries.csv', 'entries', export_entries),
+    ]),
+    (create_export_proper_nouns, [
+        ('entities.csv', 'entities', export_entities),
+        ('authors.csv', 'authors', export_authors),
+        ('works.csv', 'works', export_works),
+        ('entry_entity_mentions.csv', 'entity mentions', export_entry_entity_mentions),
+        ('entry_citations.csv', 'citations', export_entry_citations),
+    ]),
+    (None, [
+        ('aliases.csv', 'aliases', export_aliases),
+    ]),
+    (None, [
+        ('etymologies.csv', 'etymologies', export_etymologies),
+    ]),
+]
+
+
+def run_export_group(output_dir, group_index):
+    """Run one EXPORT_GROUPS entry on its own connection; returns {filename: count}."""
+    setup, exports = EXPORT_GROUPS[group_index]
+    conn = db.get_connection()
+    try:
+        if setup:
+            setup(conn)
+        stats = {}
+        for filename, description, export in exports:
+            print(f"Exporting {description}...")
+            stats[filename] = export(conn, output_dir)
+        return stats
+    finally:
+        conn.close()
+
+
 def generate_summary(output_dir, stats):
     """Generate a summary file with export statistics."""
     summary_path = os.path.join(output_dir, 'EXPORT_SUMMARY.md')
@@ -624,40 +725,20 @@ def main():
 
     print(f"Exporting to: {output_dir}\n")
 
-    conn = db.get_connection()
+    # Each export group runs in its own process with its own connection
+    with ProcessPoolExecutor(max_workers=len(EXPORT_GROUPS)) as executor:
+        group_stats = list(executor.map(
+            run_export_group, [output_dir] * len(EXPORT_GROUPS), range(len(EXPORT_GROUPS))
+        ))
 
+    # Summary lists files in EXPORT_GROUPS order, whichever group finished first
     stats = {}
-
-    print("Exporting entries...")
-    stats['entries.csv'] = export_entries(conn, output_dir)
-
-    print("Exporting entities...")
-    stats['entities.csv'] = export_entities(conn, output_dir)
-
-    print("Exporting authors...")
-    author_count, authors_data = export_authors(conn, output_dir)
-    stats['authors.csv'] = author_count
-
-    print("Exporting works...")
-    stats['works.csv'] = export_works(conn, output_dir, authors_data)
-
-    print("Exporting entity mentions...")
-    stats['entry_entity_mentions.csv'] = export_entry_entity_mentions(conn, output_dir)
-
-    print("Exporting citations...")
-    stats['entry_citations.csv'] = export_entry_citations(conn, output_dir)
-
-    print("Exporting aliases...")
-    stats['aliases.csv'] = export_aliases(conn, output_dir)
-
-    print("Exporting etymologies...")
-    stats['etymologies.csv'] = export_etymologies(conn, output_dir)
+    for result in group_stats:
+        stats.update(result)
 
     print("\nGenerating summary...")
     generate_summary(output_dir, stats)
 
-    conn.close()
-
     print(f"\nExport complete! Files written to: {output_dir}")
     print(f"Total records: {sum(stats.values()):,}")
 
@@ -12,10 +12,16 @@ Output: review_data.json
 import json
 import unicodedata
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
 from db import get_connection
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 OUTPUT_FILE = "review_data.json"
 
 # Greek letter ordering for sort
@@ -34,8 +40,9 @@ LETTER_SLUGS = {
 }
 
 
+@lru_cache(maxsize=1024)
 def strip_combining(char: str) -> str:
-    """Return base character without combining marks."""
+    """Return base character without combining marks (cached; first letters repeat)."""
     decomposed = unicodedata.normalize("NFD", char)
     for c in decomposed:
         if not unicodedata.combining(c):
@@ -57,35 +64,15 @@ def get_letter_slug(text: str) -> str:
     return LETTER_SLUGS.get(letter, "other")
 
 
-def greek_sort_key(lemma: str, version: str) -> tuple:
-    """
-    Generate sort key for Greek alphabetical ordering.
-
-    Returns tuple of (letter_index, lemma_normalized, version_order)
-    """
-    letter = get_first_letter(lemma)
-
-    # Get letter index (999 if not found = sorts to end)
-    try:
-        letter_idx = GREEK_LETTERS.index(letter)
-    except ValueError:
-        letter_idx = 999
-
-    # Normalize lemma for consistent sorting
-    lemma_normalized = unicodedata.normalize("NFD", lemma)
-
-    # Version order: parisinus before epitome
-    version_order = 0 if version == "parisinus" else 1
-
-    return (letter_idx, lemma_normalized, version_order)
-
-
 def export_lemmas():
     """Export all lemmas to JSON for review system."""
     conn = get_connection()
     cur = conn.cursor()
 
     # Query all lemmas with their data using normalized schema
+    # Greek alphabetical order is computed in SQL: the first base letter's
+    # position in the alphabet (either case; 999 if not Greek), then the
+    # NFD-normalized lemma in code point order, then parisinus before epitome
     query = """
         SELECT
             a.id,
@@ -105,37 +92,48 @@ def export_lemmas():
             a.billerbeck_id,
             a.word_count,
             a.confidence,
-            (SELECT json_agg(i.image_filename ORDER BY li.position)
-             FROM images i
-             JOIN lemma_images li ON li.image_id = i.id
-             WHERE li.lemma_id = a.id) as image_filenames
+            ARRAY(SELECT i.image_filename
+                  FROM images i
+                  JOIN lemma_images li ON li.image_id = i.id
+                  WHERE li.lemma_id = a.id
+                  ORDER BY li.position) as image_filenames
         FROM assembled_lemmas a
-        ORDER BY a.lemma, a.version
+        CROSS JOIN LATERAL (
+            SELECT NORMALIZE(COALESCE(a.lemma, ''), NFD) AS lemma_nfd
+        ) n
+        CROSS JOIN LATERAL (
+            SELECT POSITION(LEFT(n.lemma_nfd, 1)
+                            IN 'ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩαβγδεζηθικλμνξοπρστυφχψως') AS letter_pos
+        ) p
+        ORDER BY
+            CASE
+                WHEN p.letter_pos = 0 THEN 999
+                WHEN p.letter_pos = 49 THEN 17  -- final sigma
+                ELSE (p.letter_pos - 1) % 24
+            END,
+            n.lemma_nfd COLLATE "C",
+            CASE WHEN a.version = 'parisinus' THEN 0 ELSE 1 END,
+            a.id
     """
 
     cur.execute(query)
     rows = cur.fetchall()
 
     lemmas = []
-    for row in rows:
+    for sort_order, row in enumerate(rows):
         (lemma_id, lemma, entry_number, version, greek_text, english_translation,
          lemma_type, volume_label, meineke_id, billerbeck_id, word_count,
          confidence, image_filenames) = row
 
-        # Parse image filenames (psycopg2 auto-deserializes JSON in some cases)
-        if isinstance(image_filenames, str):
-            try:
-                image_filenames = json.loads(image_filenames)
-            except json.JSONDecodeError:
-                image_filenames = []
-        elif image_filenames is None:
-            image_filenames = []
+        lemma = lemma or ""
+        version = version or "epitome"
+        letter = get_first_letter(lemma)
 
         lemma_data = {
             "id": lemma_id,
-            "lemma": lemma or "",
+            "lemma": lemma,
             "entry_number": entry_number or 0,
-            "version": version or "epitome",
+            "version": version,
             "greek_text": greek_text or "",
             "english_translation": english_translation,
             "type": lemma_type or "",
@@ -145,21 +143,14 @@ def export_lemmas():
             "word_count": word_count or 0,
             "image_filenames": image_filenames,
             "confidence": confidence or "normal",
-            "letter": get_letter_slug(lemma or ""),
-            "sort_order": 0  # Will be set after sorting
+            "letter": LETTER_SLUGS.get(letter, "other"),
+            "sort_order": sort_order
         }
 
         lemmas.append(lemma_data)
 
     conn.close()
 
-    # Sort by Greek alphabetical order
-    lemmas.sort(key=lambda x: greek_sort_key(x["lemma"], x["version"]))
-
-    # Assign sort_order after sorting
-    for idx, lemma in enumerate(lemmas):
-        lemma["sort_order"] = idx
-
     # Create output structure
     output = {
         "lemmas": lemmas,
@@ -169,8 +160,11 @@ def export_lemmas():
 
     # Write to file
     output_path = Path(OUTPUT_FILE)
-    with output_path.open('w', encoding='utf-8') as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        output_path.write_bytes(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    else:
+        with output_path.open('w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
 
     print(f"Exported {len(lemmas)} lemmas to {output_path.absolute()}")
     print(f"File size: {output_path.stat().st_size:,} bytes")
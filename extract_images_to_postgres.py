@@ -118,7 +118,7 @@ def mark_html_processed(conn, cur, html_file_id: int, image_count: int):
         SET processed = 1, processed_at = %s, image_count = %s
         WHERE id = %s
         """,
-        (datetime.now(timezone.utc).isoformat(), image_count, html_file_id)
+        (datetime.now(timezone.utc), image_count, html_file_id)
     )
 
 
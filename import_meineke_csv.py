@@ -83,7 +83,7 @@ def import_rows(cur, rows):
                 billerbeck_id,
                 sort_order,
                 greek_paragraph,
-                datetime.now(timezone.utc).isoformat(),
+                datetime.now(timezone.utc),
             ),
         )
         imported += 1
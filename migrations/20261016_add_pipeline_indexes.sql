@@ -0,0 +1,21 @@
+-- Migration: Add indexes for the OCR/translation batch queries
+-- Date: 2026-10-16
+-- Purpose: Avoid full scans of images/assembled_lemmas when a batch starts
+
+-- batch_process.fetch_unprocessed_images: only unprocessed rows, in id order.
+-- The priority sort key COALESCEs volume_number across joined tables, so it
+-- can't be indexed on images directly; this keeps the scan to the unprocessed
+-- rows and the remaining sort to that (small) set.
+CREATE INDEX IF NOT EXISTS idx_images_unprocessed
+ON images(id)
+WHERE processed = 0;
+
+-- batch_process.get_ocr_tokens_used_today: range scan on today's rows
+CREATE INDEX IF NOT EXISTS idx_images_processed_at
+ON images(processed_at)
+WHERE processed_at IS NOT NULL;
+
+-- translate_lemmas.get_translation_tokens_today: range scan on today's rows
+CREATE INDEX IF NOT EXISTS idx_assembled_lemmas_translated_at
+ON assembled_lemmas(translated_at)
+WHERE translated_at IS NOT NULL;
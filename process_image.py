@@ -12,16 +12,26 @@ Usage:
 import argparse
 import json
 import base64
+import hashlib
 import re
 from pathlib import Path
 from datetime import datetime, timezone
 import unicodedata
+from functools import lru_cache
 
 from openai import OpenAI
 from google import genai
+from google.genai import types
 
 from db import get_connection
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 DEFAULT_MODEL = "gpt-5.1"
 DEFAULT_GEMINI_MODEL = "gemini-3-flash-preview"
 DEFAULT_GENERATION_NAME = "headword constrained"
@@ -86,6 +96,11 @@ def load_gemini_api_key():
         raise FileNotFoundError(f"Gemini API key file not found: {key_path}")
     return key_path.read_text().strip()
 
+@lru_cache(maxsize=1)
+def get_gemini_client():
+    """Gemini API client, created on first use and reused for every request"""
+    return genai.Client(api_key=load_gemini_api_key())
+
 SYSTEM_PROMPT = """You are a classical philologist interested in ancient place names from around the ancient world, as rendered in ancient Greek .                                     
   You are extracting lemma entries from scanned pages of Stephanos of           
   Byzantium's Ethnika (Billerbeck edition).                                     
@@ -187,6 +202,83 @@ EXTRACT_LEMMAS_TOOL = {
     }
 }
 
+# JSON schema for Gemini structured output
+GEMINI_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "status": {
+            "type": "string",
+            "enum": [
+                "lemmas_present",
+                "continuation_only",
+                "apparatus_only",
+                "non_greek_error"
+            ],
+            "description": "Overall page classification"
+        },
+        "notes": {
+            "type": "string",
+            "description": "Optional notes (continuation text, apparatus summary, or error description)"
+        },
+        "entries": {
+            "type": "array",
+            "description": "List of lemma entries found on the page (empty if none)",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "entry_number": {
+                        "type": "integer",
+                        "description": "The entry number as shown on the page"
+                    },
+                    "lemma": {
+                        "type": "string",
+                        "description": "The headword/lemma in Greek"
+                    },
+                    "type": {
+                        "type": "string",
+                        "enum": [
+                            "city", "island", "river", "mountain", "region",
+                            "people", "place", "spring", "promontory", "fortress",
+                            "lake", "village", "country", "other"
+                        ],
+                        "description": "The type of geographical entity"
+                    },
+                    "greek_text": {
+                        "type": "string",
+                        "description": "The full Greek text of the lemma entry, starting with the headword (do NOT include the entry number)"
+                    },
+                    "confidence": {
+                        "type": "string",
+                        "enum": ["normal", "low"],
+                        "description": "Confidence level - use 'low' if text is unclear"
+                    },
+                    "version": {
+                        "type": "string",
+                        "enum": ["epitome", "parisinus"],
+                        "description": "Version type - 'epitome' for short Byzantine summary, 'parisinus' for full unabridged text"
+                    }
+                },
+                "required": ["entry_number", "lemma", "type", "greek_text"]
+            }
+        }
+    },
+    "required": ["status", "entries"]
+}
+
+# Built once and shared by every Gemini request
+GEMINI_CONFIG = types.GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=GEMINI_RESPONSE_SCHEMA
+)
+
+# The tools, system prompt and USER_PROMPT form an identical prefix on every
+# OCR request (page-specific instructions and the image come after it), so
+# providers can serve it from their prompt cache. Routing every request with
+# the same key keeps them on the same cache; the key changes with the prompt.
+OCR_PROMPT_CACHE_KEY = "stephanos-ocr-" + hashlib.sha256(
+    (SYSTEM_PROMPT + USER_PROMPT + json.dumps(EXTRACT_LEMMAS_TOOL, sort_keys=True)).encode("utf-8")
+).hexdigest()[:16]
+
 def get_image_dir_from_db(cur, image_filename):
     """Get image directory, preferring html_files, falling back to images.image_dir"""
     cur.execute(
@@ -328,8 +420,12 @@ def get_previous_image_last_lemma(cur, image_id, volume_number):
     if not row:
         return None
 
+    return last_lemma_from_json(row[1])
+
+def last_lemma_from_json(lemma_json):
+    """Return the last entry's lemma from an image's lemma_json, if any."""
     try:
-        data = json.loads(row[1])
+        data = _json_loads(lemma_json)
         entries = data.get("entries", []) if isinstance(data, dict) else data
         if entries:
             # Return the last entry's lemma
@@ -339,18 +435,25 @@ def get_previous_image_last_lemma(cur, image_id, volume_number):
 
     return None
 
-def load_allowed_headwords(cur, volume_meta, start_after_headword=None, limit=50):
+# letter_range -> (sorted headwords, {NFC headword: index of the next headword})
+_volume_headwords_cache = {}
+
+def load_volume_headwords(cur, letter_range):
     """
-    Return a list of allowed headwords (dicts) for the volume range.
+    Return (headwords, next_index) for a volume's letter range.
 
-    If start_after_headword is provided, return up to 'limit' headwords after that one.
-    Otherwise, return the first 'limit' headwords for the volume.
+    headwords is every Meineke headword in the range, sorted alphabetically;
+    next_index maps each NFC-normalized headword to the position after it.
+    Cached per letter range, so a batch run reads meineke_headwords once per
+    volume instead of once per image.
     """
-    if not volume_meta or not volume_meta.get("letter_range"):
-        return []
-    bounds = get_letter_bounds(volume_meta["letter_range"])
+    cached = _volume_headwords_cache.get(letter_range)
+    if cached is not None:
+        return cached
+
+    bounds = get_letter_bounds(letter_range)
     if not bounds:
-        return []
+        return [], {}
     start, end = bounds
 
     # Get all headwords for this volume
@@ -364,18 +467,30 @@ def load_allowed_headwords(cur, volume_meta, start_after_headword=None, limit=50
     # Sort by normalized Greek headword (alphabetical order)
     all_headwords.sort(key=lambda hw: normalize_for_sorting(hw["greek_headword"]))
 
-    # If we have a starting point, find it and return the next 'limit' headwords
-    if start_after_headword and all_headwords:
-        # Normalize for comparison (handles OXIA vs TONOS differences)
-        normalized_start = unicodedata.normalize("NFC", start_after_headword)
+    # Normalize for comparison (handles OXIA vs TONOS differences); the first
+    # occurrence of a headword wins
+    next_index = {}
+    for idx, hw in enumerate(all_headwords):
+        next_index.setdefault(unicodedata.normalize("NFC", hw["greek_headword"]), idx + 1)
+
+    cached = (all_headwords, next_index)
+    _volume_headwords_cache[letter_range] = cached
+    return cached
 
-        # Find the index of the starting headword
-        start_idx = None
-        for idx, hw in enumerate(all_headwords):
-            if unicodedata.normalize("NFC", hw["greek_headword"]) == normalized_start:
-                start_idx = idx + 1  # Start after this one
-                break
+def load_allowed_headwords(cur, volume_meta, start_after_headword=None, limit=50):
+    """
+    Return a list of allowed headwords (dicts) for the volume range.
+
+    If start_after_headword is provided, return up to 'limit' headwords after that one.
+    Otherwise, return the first 'limit' headwords for the volume.
+    """
+    if not volume_meta or not volume_meta.get("letter_range"):
+        return []
+    all_headwords, next_index = load_volume_headwords(cur, volume_meta["letter_range"])
 
+    # If we have a starting point, find it and return the next 'limit' headwords
+    if start_after_headword and all_headwords:
+        start_idx = next_index.get(unicodedata.normalize("NFC", start_after_headword))
         if start_idx is not None:
             return all_headwords[start_idx:start_idx + limit]
 
@@ -409,14 +524,16 @@ def mark_processed(conn, cur, image_id, lemma_json, tokens_used=0, model=None, g
             ocr_last_headword = %s
         WHERE id = %s
         """,
-        (lemma_json, datetime.now(timezone.utc).isoformat(), tokens_used, model, generation_id,
+        (lemma_json, datetime.now(timezone.utc), tokens_used, model, generation_id,
          first_headword, last_headword, image_id)
     )
     conn.commit()
 
 def process_image_with_model(client, image_path=None, model=None, volume_meta=None, allowed_headwords=None, image_data=None, dual_column=False):
     """
-    Process image with specified model using tool calling, returns (payload_dict, tokens_used).
+    Process image with specified model using tool calling, returns
+    (payload_dict, tokens_used, cached_tokens), where cached_tokens is how much
+    of the prompt the provider served from its cache.
 
     Args:
         image_path: Path to image file (legacy, optional if image_data provided)
@@ -484,20 +601,24 @@ def process_image_with_model(client, image_path=None, model=None, volume_meta=No
             }
         ],
         tools=[EXTRACT_LEMMAS_TOOL],
-        tool_choice={"type": "function", "function": {"name": "extract_lemmas"}}
+        tool_choice={"type": "function", "function": {"name": "extract_lemmas"}},
+        prompt_cache_key=OCR_PROMPT_CACHE_KEY,
     )
 
     tokens_used = response.usage.total_tokens if response.usage else 0
+    cached_tokens = 0
+    if response.usage and response.usage.prompt_tokens_details:
+        cached_tokens = response.usage.prompt_tokens_details.cached_tokens or 0
 
     # Extract the tool call arguments
     tool_call = response.choices[0].message.tool_calls[0]
     arguments = json.loads(tool_call.function.arguments)
 
-    return arguments, tokens_used
+    return arguments, tokens_used, cached_tokens
 
 def process_image_with_gemini(model_name, image_path=None, volume_meta=None, allowed_headwords=None, image_data=None, dual_column=False):
     """
-    Process image with Gemini model, returns (payload_dict, tokens_used).
+    Process image with Gemini model, returns (payload_dict, tokens_used, cached_tokens).
 
     Args:
         model_name: Gemini model name (e.g., "gemini-2.5-flash")
@@ -516,73 +637,6 @@ def process_image_with_gemini(model_name, image_path=None, volume_meta=None, all
     if isinstance(image_data, memoryview):
         image_data = bytes(image_data)
 
-    # Configure Gemini API client
-    api_key = load_gemini_api_key()
-    client = genai.Client(api_key=api_key)
-
-    # Define JSON schema for structured output
-    response_schema = {
-        "type": "object",
-        "properties": {
-            "status": {
-                "type": "string",
-                "enum": [
-                    "lemmas_present",
-                    "continuation_only",
-                    "apparatus_only",
-                    "non_greek_error"
-                ],
-                "description": "Overall page classification"
-            },
-            "notes": {
-                "type": "string",
-                "description": "Optional notes (continuation text, apparatus summary, or error description)"
-            },
-            "entries": {
-                "type": "array",
-                "description": "List of lemma entries found on the page (empty if none)",
-                "items": {
-                    "type": "object",
-                    "properties": {
-                        "entry_number": {
-                            "type": "integer",
-                            "description": "The entry number as shown on the page"
-                        },
-                        "lemma": {
-                            "type": "string",
-                            "description": "The headword/lemma in Greek"
-                        },
-                        "type": {
-                            "type": "string",
-                            "enum": [
-                                "city", "island", "river", "mountain", "region",
-                                "people", "place", "spring", "promontory", "fortress",
-                                "lake", "village", "country", "other"
-                            ],
-                            "description": "The type of geographical entity"
-                        },
-                        "greek_text": {
-                            "type": "string",
-                            "description": "The full Greek text of the lemma entry, starting with the headword (do NOT include the entry number)"
-                        },
-                        "confidence": {
-                            "type": "string",
-                            "enum": ["normal", "low"],
-                            "description": "Confidence level - use 'low' if text is unclear"
-                        },
-                        "version": {
-                            "type": "string",
-                            "enum": ["epitome", "parisinus"],
-                            "description": "Version type - 'epitome' for short Byzantine summary, 'parisinus' for full unabridged text"
-                        }
-                    },
-                    "required": ["entry_number", "lemma", "type", "greek_text"]
-                }
-            }
-        },
-        "required": ["status", "entries"]
-    }
-
     # Build prompt with volume context and constraints
     extra_instructions = ""
     if dual_column:
@@ -620,18 +674,13 @@ def process_image_with_gemini(model_name, image_path=None, volume_meta=None, all
 
     # Generate response with structured output
     # Use types.Part for image data
-    from google.genai import types
-
-    response = client.models.generate_content(
+    response = get_gemini_client().models.generate_content(
         model=model_name,
         contents=[
             types.Part.from_text(text=full_prompt),
             types.Part.from_bytes(data=image_data, mime_type="image/jpeg")
         ],
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json",
-            response_schema=response_schema
-        )
+        config=GEMINI_CONFIG
     )
 
     # Parse JSON response
@@ -639,10 +688,12 @@ def process_image_with_gemini(model_name, image_path=None, volume_meta=None, all
 
     # Get token usage from metadata
     tokens_used = 0
+    cached_tokens = 0
     if hasattr(response, 'usage_metadata') and response.usage_metadata:
         tokens_used = response.usage_metadata.total_token_count
+        cached_tokens = response.usage_metadata.cached_content_token_count or 0
 
-    return payload, tokens_used
+    return payload, tokens_used, cached_tokens
 
 def main():
     parser = argparse.ArgumentParser(description="Process images with OpenAI or Gemini vision")
@@ -747,14 +798,14 @@ def main():
 
     # Process with selected provider
     if args.provider == "gemini":
-        payload, tokens_used = process_image_with_gemini(
+        payload, tokens_used, cached_tokens = process_image_with_gemini(
             args.model, image_path, volume_meta=volume_meta, allowed_headwords=allowed_headwords,
             dual_column=args.dual_column
         )
     else:  # openai
         api_key = load_api_key()
         client = OpenAI(api_key=api_key)
-        payload, tokens_used = process_image_with_model(
+        payload, tokens_used, cached_tokens = process_image_with_model(
             client, image_path, args.model, volume_meta=volume_meta, allowed_headwords=allowed_headwords,
             dual_column=args.dual_column
         )
@@ -775,7 +826,8 @@ def main():
     conn.close()
 
     entry_count = len(payload.get("entries", [])) if isinstance(payload, dict) else 0
-    print(f"OK ({entry_count} entries, {tokens_used} tokens, model: {args.model})")
+    cache_note = f", prompt cache: {cached_tokens:,}" if cached_tokens else ""
+    print(f"OK ({entry_count} entries, {tokens_used} tokens{cache_note}, model: {args.model})")
 
 if __name__ == "__main__":
     main()
@@ -36,9 +36,7 @@ uv run extract_images_to_postgres.py --from-db 2>&1 | tee -a "$LOGFILE"
 
 # Step 3: Process images with gpt-5 (no limit, will stop at daily token limit)
 echo "Step 3: Processing images with gpt-5..." | tee -a "$LOGFILE"
-uv run batch_process.py \
-    --delay 1 \
-    2>&1 | tee -a "$LOGFILE"
+uv run batch_process.py 2>&1 | tee -a "$LOGFILE"
 
 # Step 4: Assemble lemmas across pages (handles continuations and human overrides)
 echo "Step 4: Assembling lemmas..." | tee -a "$LOGFILE"
@@ -10,7 +10,7 @@ import argparse
 import json
 import time
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from openai import OpenAI
 
@@ -47,14 +47,14 @@ def load_api_key():
 
 def get_translation_tokens_today(cur):
     """Get total translation tokens used today"""
-    today = datetime.now(timezone.utc).date().isoformat()
+    today = datetime.now(timezone.utc).date()
     cur.execute(
         """
         SELECT COALESCE(SUM(translation_tokens), 0)
         FROM assembled_lemmas
-        WHERE DATE(translated_at) = %s
+        WHERE translated_at >= %s AND translated_at < %s
         """,
-        (today,)
+        (today, today + timedelta(days=1))
     )
     row = cur.fetchone()
     return row[0] if row else 0
@@ -92,7 +92,7 @@ def fetch_lemmas_needing_translation(cur, current_prompt_version: int):
     """
     cur.execute(
         """
-        SELECT id, lemma, entry_number, type, greek_text, human_greek_text, human_notes, confidence, assembled_json
+        SELECT id, lemma, entry_number, type, greek_text, human_greek_text, human_notes, confidence
         FROM assembled_lemmas
         WHERE
             -- Exclude entries that have human translations
@@ -146,7 +146,7 @@ def mark_translated(conn, cur, lemma_id, translation: str, tokens_used: int, pro
             translation_prompt_version = %s
         WHERE id = %s
         """,
-        (translation, translation_json, datetime.now(timezone.utc).isoformat(), tokens_used, prompt_version, lemma_id)
+        (translation, translation_json, datetime.now(timezone.utc), tokens_used, prompt_version, lemma_id)
     )
     conn.commit()
 
@@ -250,7 +250,7 @@ def main():
     translated_count = 0
     total_tokens_this_run = 0
 
-    for lemma_id, lemma_text, entry_number, lemma_type, greek_text, human_greek_text, human_notes, confidence, assembled_json in needs_translation:
+    for lemma_id, lemma_text, entry_number, lemma_type, greek_text, human_greek_text, human_notes, confidence in needs_translation:
         # Check if we've hit the limit
         if args.limit and translated_count >= args.limit:
             print(f"Reached translation limit ({args.limit} lemmas).")
@@ -68,20 +68,34 @@ def infer_volume_metadata(path_or_name: Optional[Path | str], fallback_name: Opt
     return None
 
 
-def ensure_volume_columns(cur):
-    """Ensure volume metadata columns exist on images/epubs/pdf_files tables."""
-    cur.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS volume_number INTEGER")
-    cur.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS volume_label TEXT")
-    cur.execute("ALTER TABLE images ADD COLUMN IF NOT EXISTS letter_range TEXT")
+VOLUME_COLUMNS = (
+    ("volume_number", "INTEGER"),
+    ("volume_label", "TEXT"),
+    ("letter_range", "TEXT"),
+)
+
+# images is required; the other tables only get columns if they exist
+VOLUME_TABLES = ("images", "epubs", "pdf_files", "assembled_lemmas")
 
-    cur.execute("ALTER TABLE IF EXISTS epubs ADD COLUMN IF NOT EXISTS volume_number INTEGER")
-    cur.execute("ALTER TABLE IF EXISTS epubs ADD COLUMN IF NOT EXISTS volume_label TEXT")
-    cur.execute("ALTER TABLE IF EXISTS epubs ADD COLUMN IF NOT EXISTS letter_range TEXT")
 
-    cur.execute("ALTER TABLE IF EXISTS pdf_files ADD COLUMN IF NOT EXISTS volume_number INTEGER")
-    cur.execute("ALTER TABLE IF EXISTS pdf_files ADD COLUMN IF NOT EXISTS volume_label TEXT")
-    cur.execute("ALTER TABLE IF EXISTS pdf_files ADD COLUMN IF NOT EXISTS letter_range TEXT")
+def ensure_volume_columns(cur):
+    """Ensure volume metadata columns exist on images/epubs/pdf_files tables."""
+    # One catalog query up front, so the ALTERs (and their ACCESS EXCLUSIVE
+    # locks) only run for columns that are actually missing
+    cur.execute(
+        """
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = ANY(%s)
+        """,
+        (list(VOLUME_TABLES),),
+    )
+    existing = set(cur.fetchall())
+    tables = {table for table, _ in existing}
 
-    cur.execute("ALTER TABLE IF EXISTS assembled_lemmas ADD COLUMN IF NOT EXISTS volume_number INTEGER")
-    cur.execute("ALTER TABLE IF EXISTS assembled_lemmas ADD COLUMN IF NOT EXISTS volume_label TEXT")
-    cur.execute("ALTER TABLE IF EXISTS assembled_lemmas ADD COLUMN IF NOT EXISTS letter_range TEXT")
+    for table in VOLUME_TABLES:
+        if table != "images" and table not in tables:
+            continue
+        for column, column_type in VOLUME_COLUMNS:
+            if (table, column) not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")